@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 import os
 import sys
 from datetime import datetime
+import pytz
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -24,6 +25,21 @@ class Product(db.Model):
     low_stock_threshold = db.Column(db.Integer, default=10)
     date_added = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Stock movement ledger (same as in app.py); every stock change is logged here
+def get_cat_time():
+    return datetime.now(pytz.timezone('Africa/Kigali'))
+
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movement'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity_change = db.Column(db.Integer, nullable=False, default=0)
+    individual_change = db.Column(db.Integer, nullable=False, default=0)
+    reason = db.Column(db.String(20), nullable=False)
+    sale_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=get_cat_time)
+
 def add_or_update_product(name, stock, price=None, purchase_price=None, category="General"):
     """
     Add a new product or update an existing one.
@@ -45,6 +61,9 @@ def add_or_update_product(name, stock, price=None, purchase_price=None, category
         # Update existing product
         old_stock = existing_product.stock
         existing_product.stock = stock
+        if stock != (old_stock or 0):
+            db.session.add(StockMovement(product_id=existing_product.id,
+                                         quantity_change=stock - (old_stock or 0), reason='import'))
         
         if price is not None:
             existing_product.price = price
@@ -74,6 +93,8 @@ def add_or_update_product(name, stock, price=None, purchase_price=None, category
         )
         
         db.session.add(new_product)
+        db.session.flush()
+        db.session.add(StockMovement(product_id=new_product.id, quantity_change=stock, reason='import'))
         db.session.commit()
         return new_product, f"Added new product: {name} (Stock: {stock})"
 
@@ -1,6 +1,8 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, session, g
+from flask import Flask, render_template, stream_template, stream_with_context, Response, redirect, url_for, flash, request, session, g, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
@@ -13,6 +15,9 @@ import re
 import random
 import string
 import sqlite3
+import csv
+import io
+import click
 from decimal import Decimal
 from dotenv import load_dotenv
 import logging
@@ -72,12 +77,38 @@ if is_pythonanywhere:
         
         logger.info(f"Using fallback database configuration: {app.config['SQLALCHEMY_DATABASE_URI']}")
 else:
-    # Local development configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
-    logger.info("Using local database at: inventory.db")
+    # Local development configuration, overridable for scripts that need a scratch database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///inventory.db')
+    logger.info(f"Using local database at: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Settings applied to every new SQLite connection, chosen with bench_sqlite.py.
+# WAL lets reports read while cashiers write; SQLITE_JOURNAL_MODE=DELETE turns
+# it off on file systems without shared memory support.
+SQLITE_JOURNAL_MODE = (os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL').upper()
+SQLITE_PRAGMAS = {
+    'journal_mode': SQLITE_JOURNAL_MODE,
+    # NORMAL is only safe against power loss in WAL mode; a rollback journal needs FULL
+    'synchronous': 'NORMAL' if SQLITE_JOURNAL_MODE == 'WAL' else 'FULL',
+    'busy_timeout': 10000  # Wait up to 10 s for the write lock before "database is locked"
+}
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS when the pool opens a new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            try:
+                cursor.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.Error as e:
+                logger.warning(f"Could not set PRAGMA {name}: {str(e)}")
+    finally:
+        cursor.close()
+
 # Internationalization configuration
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'locale'
@@ -97,38 +128,117 @@ def format_currency(value):
     """Format a value as currency"""
     return f"RWF {int(value):,}"
 
-def get_uncashed_sales():
-    """Calculate uncashed sales based on is_cashed_out field"""
-    
-    # Check if the is_cashed_out column exists in the sale table
-    try:
-        # Try to use the is_cashed_out field
-        uncashed_sales = Sale.query.filter(Sale.is_cashed_out == False).all()
-    except Exception as e:
-        # Fall back to the old method if the column doesn't exist
-        logger.warning(f"is_cashed_out column not found, using date-based method: {str(e)}")
-        
-        # Get the most recent cashout (regardless of date)
-        most_recent_cashout = CashoutRecord.query.order_by(CashoutRecord.cashed_out_at.desc()).first()
-        
-        # Get sales that haven't been cashed out yet
-        if most_recent_cashout:
-            # Only get sales after the most recent cashout
-            uncashed_sales = Sale.query.filter(
-                Sale.date_sold > most_recent_cashout.cashed_out_at
-            ).all()
+def uncashed_sales_condition():
+    """SQL condition matching the sales not yet covered by a cashout"""
+    return Sale.is_cashed_out == False
+
+def get_uncashed_sales(cashier_id=None):
+    """Total the sales not yet cashed out, overall and per cashier.
+
+    Only the grouped totals are read from the database; use
+    list_uncashed_sales() when the sales themselves are displayed.
+    """
+    query = db.session.query(
+        Sale.cashier_id,
+        User.username,
+        db.func.count(Sale.id),
+        db.func.coalesce(db.func.sum(Sale.total_price), 0)
+    ).join(User, User.id == Sale.cashier_id).filter(uncashed_sales_condition())
+
+    if cashier_id is not None:
+        query = query.filter(Sale.cashier_id == cashier_id)
+
+    cashiers = {}
+    for row_cashier_id, username, count, revenue in query.group_by(Sale.cashier_id, User.username).order_by(User.username):
+        cashiers[row_cashier_id] = {
+            'username': username,
+            'total_revenue': revenue,
+            'transaction_count': count
+        }
+
+    return {
+        'total_revenue': sum(cashier['total_revenue'] for cashier in cashiers.values()),
+        'transaction_count': sum(cashier['transaction_count'] for cashier in cashiers.values()),
+        'cashiers': cashiers
+    }
+
+def list_uncashed_sales(cashier_id=None, cursor=None, page_size=None):
+    """Return one page of uncashed sales, newest first, and the next page cursor"""
+    query = Sale.query.options(db.joinedload(Sale.product), db.joinedload(Sale.cashier)).filter(
+        uncashed_sales_condition()
+    )
+    if cashier_id is not None:
+        query = query.filter(Sale.cashier_id == cashier_id)
+    return paginate_sales(query, cursor, page_size or SALES_PAGE_SIZE)
+
+def get_dashboard_summary(today):
+    """Collect all admin dashboard widget numbers in two round trips"""
+    # Product counts, the category histogram and the low stock list come from
+    # one statement: kind 0 rows are per-category counts (in order of the
+    # category's first product), kind 1 rows are products running low
+    result = db.session.execute(text("""
+        SELECT 0 AS kind, MIN(id) AS position, category, NULL,
+               COUNT(*),
+               SUM(CASE WHEN stock <= low_stock_threshold THEN 1 ELSE 0 END),
+               SUM(CASE WHEN stock = 0 THEN 1 ELSE 0 END)
+        FROM product
+        GROUP BY category
+        UNION ALL
+        SELECT 1, id, category, name, stock, low_stock_threshold, NULL
+        FROM product
+        WHERE stock <= low_stock_threshold AND stock > 0
+        ORDER BY kind, position
+    """))
+
+    category_counts = {}
+    total_products = 0
+    low_stock_count = 0
+    out_of_stock_products = 0
+    low_stock_items = []
+    for kind, position, category, name, count_or_stock, low_or_threshold, out_count in result:
+        if kind == 0:
+            category_counts[category] = count_or_stock
+            total_products += count_or_stock
+            low_stock_count += low_or_threshold or 0
+            out_of_stock_products += out_count or 0
         else:
-            # No cashouts ever, get all sales
-            uncashed_sales = Sale.query.all()
-    
-    # Calculate totals for uncashed sales only
-    total_revenue = sum(sale.total_price for sale in uncashed_sales)
-    transaction_count = len(uncashed_sales)
-    
+            low_stock_items.append({
+                'id': position,
+                'name': name,
+                'category': category,
+                'stock': count_or_stock,
+                'low_stock_threshold': low_or_threshold
+            })
+
+    # Today's totals come from the daily rollup, the register totals from the
+    # partial index over the sales not yet cashed out
+    row = db.session.execute(text("""
+        SELECT today.transaction_count, today.revenue, today.profit,
+               uncashed.transaction_count, uncashed.revenue
+        FROM (
+            SELECT SUM(transaction_count) AS transaction_count,
+                   SUM(revenue) AS revenue,
+                   SUM(revenue - cost) AS profit
+            FROM daily_sales_summary
+            WHERE business_date = :today
+        ) AS today, (
+            SELECT COUNT(*) AS transaction_count, COALESCE(SUM(total_price), 0) AS revenue
+            FROM sale
+            WHERE is_cashed_out = 0
+        ) AS uncashed
+    """), {'today': today.isoformat()}).one()
+
     return {
-        'total_revenue': total_revenue,
-        'transaction_count': transaction_count,
-        'sales': uncashed_sales
+        'total_products': total_products,
+        'low_stock_count': low_stock_count,
+        'out_of_stock_products': out_of_stock_products,
+        'low_stock_items': low_stock_items,
+        'category_counts': category_counts,
+        'today_sales_count': row[0] or 0,
+        'total_revenue': row[1] or 0,
+        'total_profit': row[2] or 0,
+        'uncashed_transactions': row[3],
+        'uncashed_revenue': row[4]
     }
 
 # Try to initialize Babel with error handling
@@ -167,6 +277,39 @@ def get_cat_time():
     cat_timezone = pytz.timezone('Africa/Kigali')  # Kigali is in Rwanda and uses CAT
     return datetime.now(cat_timezone)
 
+# Helper function to get the current business date in CAT
+def get_cat_date():
+    return get_cat_time().date()
+
+# How far back a sale replayed from an offline till may be dated. Older
+# sales would land in days and months whose totals are already closed.
+MAX_REPLAY_AGE_DAYS = 2
+
+def parse_client_time(value):
+    """Convert an ISO timestamp sent by a client into CAT time.
+
+    Returns None when the value is missing or invalid. Times in the future
+    (a till with a fast clock) are clamped to now. Naive times are taken as CAT.
+    Raises ValueError with a user-facing message for times more than
+    MAX_REPLAY_AGE_DAYS days ago.
+    """
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        # fromisoformat only understands the 'Z' suffix from Python 3.11
+        client_time = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    cat_timezone = pytz.timezone('Africa/Kigali')
+    if client_time.tzinfo is None:
+        client_time = cat_timezone.localize(client_time)
+    client_time = client_time.astimezone(cat_timezone)
+    now = get_cat_time()
+    if client_time < now - timedelta(days=MAX_REPLAY_AGE_DAYS):
+        raise ValueError(_('This sale is dated {0}, more than {1} days ago, and was not recorded. Please enter it again if it is still valid.').format(
+            client_time.strftime('%Y-%m-%d %H:%M'), MAX_REPLAY_AGE_DAYS))
+    return min(client_time, now)
+
 # Database models
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -194,6 +337,9 @@ class Product(db.Model):
     units_per_package = db.Column(db.Integer, nullable=True, default=1)
     individual_price = db.Column(db.Float, nullable=True, default=0)
     individual_stock = db.Column(db.Integer, nullable=True, default=0)
+    # Bumped by every admin edit so an edit made from a stale form is refused.
+    # Sales change stock with relative updates and leave it alone.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     def is_low_stock(self):
         if self.is_packaged:
@@ -213,6 +359,38 @@ class Product(db.Model):
             return (self.stock * self.units_per_package) + self.individual_stock
         return self.stock
 
+# Case-insensitive name index so LIKE 'prefix%' lookups are index range scans
+db.Index('ix_product_name_nocase', db.collate(Product.name, 'NOCASE'))
+# Covers the dashboard category histogram, the category filter and the category dropdowns
+db.Index('ix_product_category_stock', Product.category, Product.stock, Product.low_stock_threshold)
+# Partial index holding only the products at or below their reorder level
+db.Index('ix_product_low_stock', Product.stock, sqlite_where=Product.stock <= Product.low_stock_threshold)
+
+# Full-text index over the product catalog. It is an external-content FTS5
+# table, so it stores only the index and the triggers keep it in step with
+# every insert, update and delete on product.
+PRODUCT_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        name, description, category,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, description, category ON product BEGIN
+        INSERT INTO product_fts(product_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END"""
+]
+
 class Sale(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
@@ -222,6 +400,46 @@ class Sale(db.Model):
     cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     cashier = db.relationship('User', backref=db.backref('sales', lazy=True))
     date_sold = db.Column(db.DateTime, default=get_cat_time)
+    # Local (CAT) calendar day of date_sold, fixed when the sale is recorded
+    business_date = db.Column(db.Date, default=get_cat_date)
+    # Price charged and purchase cost per unit at the time of the sale, so
+    # later product edits do not rewrite historical profit
+    unit_price = db.Column(db.Float)
+    unit_cost = db.Column(db.Float)
+    # Product category at the time of the sale; the daily rollup and the
+    # category filters use it, so recategorising a product keeps past sales
+    # where they were
+    category = db.Column(db.String(50))
+    receipt_id = db.Column(db.Integer, db.ForeignKey('receipt.id'), nullable=True)
+    receipt = db.relationship('Receipt', backref=db.backref('sales', lazy=True))
+    # Set together by perform_cashout when the sale's cash leaves the register
+    is_cashed_out = db.Column(db.Boolean, nullable=False, default=False)
+    cashout_id = db.Column(db.Integer, db.ForeignKey('cashout_record.id'), nullable=True)
+
+# Date range listings and the uncashed register totals (covering: date_sold, total_price)
+db.Index('ix_sale_date_sold_total_price', Sale.date_sold, Sale.total_price)
+# Day and period filters, overall and for one cashier. date_sold follows
+# business_date so the sales listings page through the index in order.
+db.Index('ix_sale_business_date_sold', Sale.business_date, Sale.date_sold)
+db.Index('ix_sale_cashier_business_date_sold', Sale.cashier_id, Sale.business_date, Sale.date_sold)
+db.Index('ix_sale_product_id', Sale.product_id)
+db.Index('ix_sale_receipt_id', Sale.receipt_id)
+# The register totals only ever read the sales not yet cashed out, so this
+# index stays as small as one day's takings
+db.Index('ix_sale_uncashed', Sale.cashier_id, Sale.total_price, sqlite_where=Sale.is_cashed_out == False)
+# Totals and listings of the sales covered by one cashout
+db.Index('ix_sale_cashout_id_total_price', Sale.cashout_id, Sale.total_price)
+
+class Receipt(db.Model):
+    """Header for one checkout; its lines are the Sale rows pointing at it"""
+    id = db.Column(db.Integer, primary_key=True)
+    cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    cashier = db.relationship('User', backref=db.backref('receipts', lazy=True))
+    created_at = db.Column(db.DateTime, default=get_cat_time)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    # Client-generated key so retried API submissions are only recorded once
+    idempotency_key = db.Column(db.String(64), nullable=True, unique=True, index=True)
 
 class MonthlyProfit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -235,6 +453,65 @@ class MonthlyProfit(db.Model):
     # Ensure year and month combination is unique
     __table_args__ = (db.UniqueConstraint('year', 'month', name='unique_year_month'),)
 
+class DailySalesSummary(db.Model):
+    """Sales rolled up per business day, product category and cashier"""
+    __tablename__ = 'daily_sales_summary'
+    id = db.Column(db.Integer, primary_key=True)
+    business_date = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(50), nullable=False, default='Uncategorized')
+    cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cost = db.Column(db.Float, nullable=False, default=0.0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # One row per day, category and cashier
+    __table_args__ = (db.UniqueConstraint('business_date', 'category', 'cashier_id', name='unique_daily_sales_summary'),)
+
+class CashierBalance(db.Model):
+    """Running sales totals per cashier, kept in step with the sale table"""
+    __tablename__ = 'cashier_balance'
+    cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    lifetime_revenue = db.Column(db.Float, nullable=False, default=0.0)
+    # Sales recorded since the last cashout, i.e. cash the cashier still holds
+    uncashed_revenue = db.Column(db.Float, nullable=False, default=0.0)
+    uncashed_count = db.Column(db.Integer, nullable=False, default=0)
+
+class StockMovement(db.Model):
+    """Append-only record of every change to a product's stock.
+
+    reason is 'added' for a new product, 'sale' and 'sale_deleted' for sales
+    and their reversal, 'received' for deliveries and 'adjustment' for other
+    corrections entered by an admin, and 'import' for the bulk import scripts.
+    """
+    __tablename__ = 'stock_movement'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity_change = db.Column(db.Integer, nullable=False, default=0)
+    individual_change = db.Column(db.Integer, nullable=False, default=0)
+    reason = db.Column(db.String(20), nullable=False)
+    # Not a foreign key: the movement outlives a deleted sale
+    sale_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=get_cat_time)
+
+# Movements of one product after a snapshot (product_id, id), and all
+# movements in a date range
+db.Index('ix_stock_movement_product_id', StockMovement.product_id)
+db.Index('ix_stock_movement_created_at', StockMovement.created_at)
+
+class StockSnapshot(db.Model):
+    """A product's stock as of the movement last_movement_id"""
+    __tablename__ = 'stock_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False, default=get_cat_time)
+    stock = db.Column(db.Integer, nullable=False, default=0)
+    individual_stock = db.Column(db.Integer, nullable=False, default=0)
+    last_movement_id = db.Column(db.Integer, nullable=False, default=0)
+
+db.Index('ix_stock_snapshot_product_taken_at', StockSnapshot.product_id, StockSnapshot.taken_at)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -398,113 +675,25 @@ def admin_dashboard():
             return redirect(url_for('index'))
         
         # Get today's date in Central Africa Time (CAT, GMT+2)
-        cat = pytz.timezone('Africa/Johannesburg')
-        today = datetime.now(cat).date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
+        today = get_cat_date()
         
-        # Get counts and product data
+        # Get product counts, today's sales and uncashed totals in aggregate queries
         try:
-            # Use raw SQL queries to avoid problematic columns
-            conn = db.engine.connect()
-            
-            # Get product counts
-            result = conn.execute(text("SELECT COUNT(*) FROM product"))
-            total_products = result.scalar()
-            
-            result = conn.execute(text("SELECT COUNT(*) FROM product WHERE stock <= low_stock_threshold"))
-            low_stock_count = result.scalar()
-            
-            result = conn.execute(text("SELECT COUNT(*) FROM product WHERE stock = 0"))
-            out_of_stock_products = result.scalar()
-            
-            # Get all products for category statistics
-            result = conn.execute(text("""
-                SELECT id, name, description, category, purchase_price, price, stock, low_stock_threshold, date_added 
-                FROM product
-            """))
-            
-            all_products = []
-            for row in result:
-                product_dict = {
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2],
-                    'category': row[3],
-                    'purchase_price': row[4],
-                    'price': row[5],
-                    'stock': row[6],
-                    'low_stock_threshold': row[7],
-                    'date_added': row[8],
-                    # Add default values for the problematic columns
-                    'is_packaged': False,
-                    'units_per_package': 1,
-                    'individual_price': 0,
-                    'individual_stock': 0
-                }
-                all_products.append(product_dict)
-            
-            # Get low stock products as a list (not just count)
-            result = conn.execute(text("""
-                SELECT id, name, description, category, purchase_price, price, stock, low_stock_threshold, date_added 
-                FROM product 
-                WHERE stock <= low_stock_threshold AND stock > 0
-            """))
-            
-            low_stock_items = []
-            for row in result:
-                product_dict = {
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2],
-                    'category': row[3],
-                    'purchase_price': row[4],
-                    'price': row[5],
-                    'stock': row[6],
-                    'low_stock_threshold': row[7],
-                    'date_added': row[8],
-                    # Add default values for the problematic columns
-                    'is_packaged': False,
-                    'units_per_package': 1,
-                    'individual_price': 0,
-                    'individual_stock': 0
-                }
-                low_stock_items.append(product_dict)
-                
-            conn.close()
+            summary = get_dashboard_summary(today)
         except Exception as e:
-            logger.error(f"Error getting product counts: {str(e)}")
-            total_products = 0
-            low_stock_count = 0
-            out_of_stock_products = 0
-            all_products = []
-            low_stock_items = []
-        
-        # Get today's sales
-        try:
-            today_sales = Sale.query.filter(
-                db.func.date(Sale.date_sold) == today.strftime('%Y-%m-%d')
-            ).all()
-            today_sales_count = len(today_sales)
-            
-            # Handle case where purchase_price might be None
-            total_revenue = sum(sale.total_price for sale in today_sales)
-            
-            # Calculate profit with error handling for each sale
-            total_profit = 0
-            for sale in today_sales:
-                try:
-                    purchase_price = sale.product.purchase_price or 0
-                    profit = sale.total_price - (purchase_price * sale.quantity)
-                    total_profit += profit
-                except Exception as e:
-                    logger.error(f"Error calculating profit for sale {sale.id}: {str(e)}")
-        except Exception as e:
-            logger.error(f"Error getting today's sales: {str(e)}")
-            today_sales = []
-            today_sales_count = 0
-            total_revenue = 0
-            total_profit = 0
+            logger.error(f"Error getting dashboard summary: {str(e)}")
+            summary = {
+                'total_products': 0,
+                'low_stock_count': 0,
+                'out_of_stock_products': 0,
+                'low_stock_items': [],
+                'category_counts': {},
+                'today_sales_count': 0,
+                'total_revenue': 0,
+                'total_profit': 0,
+                'uncashed_transactions': 0,
+                'uncashed_revenue': 0
+            }
         
         # Get recent sales
         try:
@@ -567,28 +756,18 @@ def admin_dashboard():
             month_to_date_profit = 0
             month_to_date_revenue = 0
         
-        # Get uncashed sales data
-        try:
-            uncashed_data = get_uncashed_sales()
-            uncashed_revenue = uncashed_data['total_revenue']
-            uncashed_transactions = uncashed_data['transaction_count']
-        except Exception as e:
-            logger.error(f"Error getting uncashed sales: {str(e)}")
-            uncashed_revenue = 0
-            uncashed_transactions = 0
-            
         return render_template('admin_dashboard.html', 
-                               total_products=total_products,
-                               low_stock_count=low_stock_count,
-                               low_stock_products=low_stock_items,  # Pass the list of products, not just the count
-                               out_of_stock_products=out_of_stock_products,
-                               today_sales_count=today_sales_count,
-                               total_revenue=total_revenue,
-                               total_profit=total_profit,
+                               total_products=summary['total_products'],
+                               low_stock_count=summary['low_stock_count'],
+                               low_stock_products=summary['low_stock_items'],  # Pass the list of products, not just the count
+                               out_of_stock_products=summary['out_of_stock_products'],
+                               today_sales_count=summary['today_sales_count'],
+                               total_revenue=summary['total_revenue'],
+                               total_profit=summary['total_profit'],
                                recent_sales=recent_sales,
-                               products=all_products,  # Pass all products for category statistics
-                               uncashed_revenue=uncashed_revenue,
-                               uncashed_transactions=uncashed_transactions,
+                               category_counts=summary['category_counts'],  # Product count per category
+                               uncashed_revenue=summary['uncashed_revenue'],
+                               uncashed_transactions=summary['uncashed_transactions'],
                                latest_monthly_profit=latest_monthly_profit,
                                month_to_date_profit=month_to_date_profit,
                                month_to_date_revenue=month_to_date_revenue,
@@ -611,15 +790,14 @@ def manage_products():
         # Try using the SQLAlchemy ORM first
         try:
             if search_query:
-                # Search in name, description, and category fields
-                search_term = f'%{search_query}%'
-                products = Product.query.filter(
-                    db.or_(
-                        Product.name.like(search_term),
-                        Product.description.like(search_term),
-                        Product.category.like(search_term)
-                    )
-                ).order_by(Product.name).all()
+                # Search name, description and category through the full-text index
+                ranking = product_search_ranking(search_query)
+                if ranking is None:
+                    products = []
+                else:
+                    products = Product.query.join(
+                        ranking, ranking.c.product_id == Product.id
+                    ).order_by(ranking.c.rank, Product.name).all()
             else:
                 products = Product.query.order_by(Product.name).all()
                 
@@ -627,43 +805,37 @@ def manage_products():
             return render_template('manage_products.html', products=products, search_query=search_query)
             
         except Exception as orm_error:
-            # If ORM fails, fall back to direct SQLite
-            logger.warning(f"ORM query failed, falling back to direct SQLite: {str(orm_error)}")
-            
+            # If ORM fails, fall back to plain SQL over the same database
+            logger.warning(f"ORM query failed, falling back to plain SQL: {str(orm_error)}")
+            db.session.rollback()
+
             # Create a list to hold product objects
             products = []
-            
-            # Use direct SQLite connection
-            import sqlite3
-            conn = sqlite3.connect('instance/inventory.db')
-            conn.row_factory = sqlite3.Row  # This allows accessing columns by name
-            cursor = conn.cursor()
-            
+
             # Get all column names from the product table
-            cursor.execute("PRAGMA table_info(product)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
+            columns = [col[1] for col in db.session.execute(text("PRAGMA table_info(product)"))]
+
             # Build a query that selects all available columns
             columns_str = ', '.join(columns)
-            
+
             if search_query:
                 # Search in name, description, and category fields
                 search_term = f'%{search_query}%'
-                cursor.execute(f"""
+                result = db.session.execute(text(f"""
                     SELECT {columns_str}
-                    FROM product 
-                    WHERE name LIKE ? OR description LIKE ? OR category LIKE ? 
+                    FROM product
+                    WHERE name LIKE :term OR description LIKE :term OR category LIKE :term
                     ORDER BY name
-                """, (search_term, search_term, search_term))
+                """), {'term': search_term})
             else:
-                cursor.execute(f"""
+                result = db.session.execute(text(f"""
                     SELECT {columns_str}
-                    FROM product 
+                    FROM product
                     ORDER BY name
-                """)
-            
+                """))
+
             # Convert the result to a list of objects that mimic Product objects
-            for row in cursor.fetchall():
+            for row in result.mappings():
                 # Create a simple object that has the same attributes as a Product
                 class SimpleProduct:
                     pass
@@ -690,8 +862,6 @@ def manage_products():
                 
                 products.append(product)
             
-            conn.close()
-            
             return render_template('manage_products.html', products=products, search_query=search_query)
             
     except Exception as e:
@@ -719,25 +889,28 @@ def add_product():
             stock = int(request.form.get('stock'))
             low_stock_threshold = int(request.form.get('low_stock_threshold'))
             
-            # Use direct SQLite connection to avoid SQLAlchemy ORM issues
-            import sqlite3
-            from datetime import datetime
-            
-            conn = sqlite3.connect('instance/inventory.db')
-            cursor = conn.cursor()
-            
-            # Insert the product using only the basic columns that exist in the database
-            cursor.execute("""
-                INSERT INTO product (name, description, category, purchase_price, price, stock, low_stock_threshold, date_added)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (name, description, category, purchase_price, price, stock, low_stock_threshold, datetime.now()))
-            
-            conn.commit()
-            conn.close()
-            
+            product = Product(
+                name=name,
+                description=description,
+                category=category,
+                purchase_price=purchase_price,
+                price=price,
+                stock=stock,
+                low_stock_threshold=low_stock_threshold,
+                date_added=datetime.now()
+            )
+            db.session.add(product)
+            db.session.flush()
+
+            # Log the opening stock in the same transaction
+            record_stock_movement(product.id, 'added', quantity_change=stock, user_id=current_user.id)
+
+            db.session.commit()
+
             flash(_('Product added successfully!'), 'success')
             return redirect(url_for('manage_products'))
         except Exception as e:
+            db.session.rollback()
             import traceback
             error_traceback = traceback.format_exc()
             logger.error(f"Error in add_product: {str(e)}\n{error_traceback}")
@@ -758,10 +931,8 @@ def cashier_dashboard():
             logger.warning(f"Non-cashier accessing cashier dashboard: {current_user.username}, role: {current_user.role}")
             flash(_('Note: You are viewing the cashier dashboard but have a different role.'), 'warning')
         
-        # Get today's date
-        today = datetime.now().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
+        # Get today's business date in CAT
+        today = get_cat_date()
         
         # Get search query with error handling
         try:
@@ -770,56 +941,41 @@ def cashier_dashboard():
             logger.error(f"Error getting search query: {str(e)}")
             search_query = ''
         
-        # Get products in stock with optional search filter
+        # The product picker looks products up as the cashier types, so the
+        # page only renders matches for an explicit (non-JavaScript) search
         try:
-            products_query = Product.query.filter(Product.stock > 0)
-            
-            # Apply search filter if provided
             if search_query and search_query.strip():
-                search_term = "%" + search_query + "%"
-                products_query = products_query.filter(Product.name.like(search_term))
-            
-            # Execute query
-            products = products_query.all()
+                products = search_products(search_query.strip(), limit=MAX_SEARCH_RESULTS)
+            else:
+                products = []
         except Exception as e:
             logger.error(f"Error in product search: {str(e)}")
             products = []
         
         # Get today's sales for this cashier
         try:
-            today_sales = Sale.query.filter(
-                Sale.date_sold.between(today_start, today_end),
-                Sale.cashier_id == current_user.id
+            today_sales = Sale.query.options(db.joinedload(Sale.product)).filter(
+                Sale.cashier_id == current_user.id,
+                Sale.business_date == today
             ).all()
             
             # Calculate total revenue for today
             total_revenue = sum(sale.total_price for sale in today_sales)
             
-            # Also get all-time sales for this cashier
-            all_time_sales = Sale.query.filter(
-                Sale.cashier_id == current_user.id
-            ).all()
-            
-            # Calculate all-time total revenue
-            all_time_revenue = sum(sale.total_price for sale in all_time_sales)
         except Exception as e:
             logger.error(f"Error getting sales: {str(e)}")
             today_sales = []
             total_revenue = 0
-            all_time_sales = []
-            all_time_revenue = 0
             
-        # Get uncashed sales data (for this cashier only)
+        # All-time and uncashed totals for this cashier come from their balance row
         try:
-            uncashed_data = get_uncashed_sales()
-            all_uncashed_sales = uncashed_data['sales']
-            
-            # Filter for this cashier only
-            cashier_uncashed_sales = [sale for sale in all_uncashed_sales if sale.cashier_id == current_user.id]
-            uncashed_revenue = sum(sale.total_price for sale in cashier_uncashed_sales)
-            uncashed_transactions = len(cashier_uncashed_sales)
+            balance = db.session.get(CashierBalance, current_user.id)
+            all_time_revenue = balance.lifetime_revenue if balance else 0
+            uncashed_revenue = balance.uncashed_revenue if balance else 0
+            uncashed_transactions = balance.uncashed_count if balance else 0
         except Exception as e:
-            logger.error(f"Error getting uncashed sales for cashier: {str(e)}")
+            logger.error(f"Error getting cashier balance: {str(e)}")
+            all_time_revenue = 0
             uncashed_revenue = 0
             uncashed_transactions = 0
         
@@ -837,6 +993,54 @@ def cashier_dashboard():
         # Fallback to a simple message instead of using a template that might not exist
         return f"<html><body><h1>Error</h1><p>An error occurred while loading the cashier dashboard.</p><p>Error details: {str(e)}</p><p><a href='/'>Go to Home</a></p></body></html>"
 
+# Number of recent cashouts shown on the cashier's sales status page
+STATUS_CASHOUT_COUNT = 10
+
+@app.route('/cashier/sales-status')
+@login_required
+def cashier_sales_status():
+    try:
+        # The balance row holds the totals; only one page of the pending sales is loaded
+        balance = db.session.get(CashierBalance, current_user.id)
+        uncashed_sales, next_cursor = list_uncashed_sales(cashier_id=current_user.id)
+        
+        # This cashier's share of the most recent cashouts
+        cashouts = paginate_cashouts(CashoutRecord.query, page_size=STATUS_CASHOUT_COUNT)[0]
+        shares = {}
+        if cashouts:
+            shares = {
+                cashout_id: (count, total)
+                for cashout_id, count, total in db.session.query(
+                    Sale.cashout_id, db.func.count(Sale.id), db.func.sum(Sale.total_price)
+                ).filter(
+                    Sale.cashout_id.in_([cashout.id for cashout in cashouts]),
+                    Sale.cashier_id == current_user.id
+                ).group_by(Sale.cashout_id)
+            }
+        recent_cashouts = [
+            {
+                'date': cashout.cashed_out_at,
+                'admin': cashout.admin,
+                'transaction_count': shares[cashout.id][0],
+                'amount': shares[cashout.id][1] or 0
+            }
+            for cashout in cashouts if cashout.id in shares
+        ]
+        
+        return render_template(
+            'cashier_sales_status.html',
+            total_uncashed=balance.uncashed_revenue if balance else 0,
+            uncashed_count=balance.uncashed_count if balance else 0,
+            uncashed_sales=uncashed_sales,
+            more_sales=next_cursor is not None,
+            last_cashout_date=cashouts[0].cashed_out_at if cashouts else None,
+            recent_cashouts=recent_cashouts
+        )
+    except Exception as e:
+        logger.error(f"Error in cashier_sales_status: {str(e)}")
+        flash(_('An error occurred while loading your sales status. Please try again.'), 'danger')
+        return redirect(url_for('cashier_dashboard'))
+
 @app.route('/admin/products/edit/<int:product_id>', methods=['GET', 'POST'])
 @login_required
 def edit_product(product_id):
@@ -847,17 +1051,73 @@ def edit_product(product_id):
     product = Product.query.get_or_404(product_id)
     
     if request.method == 'POST':
-        product.name = request.form.get('name')
-        product.description = request.form.get('description')
-        product.category = request.form.get('category')
-        product.purchase_price = float(request.form.get('purchase_price', 0))
-        product.price = float(request.form.get('price'))
-        product.stock = int(request.form.get('stock'))
-        product.low_stock_threshold = int(request.form.get('low_stock_threshold'))
-        product.is_packaged = request.form.get('is_packaged') == 'on'
-        product.units_per_package = int(request.form.get('units_per_package', 1))
-        product.individual_price = float(request.form.get('individual_price', 0))
-        product.individual_stock = int(request.form.get('individual_stock', 0))
+        try:
+            version = int(request.form.get('version', 0))
+            # Stock is entered as a change ("received +24"), never as a new total,
+            # so sales made while the form was open are kept
+            stock_change = int(request.form.get('stock_change') or 0)
+            individual_stock_change = int(request.form.get('individual_stock_change') or 0)
+            purchase_price = float(request.form.get('purchase_price') or 0)
+            price = float(request.form.get('price'))
+            low_stock_threshold = int(request.form.get('low_stock_threshold'))
+            units_per_package = int(request.form.get('units_per_package') or 1)
+            individual_price = float(request.form.get('individual_price') or 0)
+        except (TypeError, ValueError):
+            flash(_('Please enter the prices as numbers, and the low stock threshold, units per package and stock change as whole numbers, e.g. 24 or -3.'), 'danger')
+            return render_template('edit_product.html', product=product)
+        reason = 'received' if request.form.get('stock_reason') == 'received' else 'adjustment'
+        
+        # Only applies if nobody else saved the product since the form was loaded
+        result = db.session.execute(text("""
+            UPDATE product SET
+                name = :name,
+                description = :description,
+                category = :category,
+                purchase_price = :purchase_price,
+                price = :price,
+                low_stock_threshold = :low_stock_threshold,
+                is_packaged = :is_packaged,
+                units_per_package = :units_per_package,
+                individual_price = :individual_price,
+                stock = stock + :stock_change,
+                individual_stock = COALESCE(individual_stock, 0) + :individual_stock_change,
+                version = version + 1
+            WHERE id = :product_id
+              AND version = :version
+              AND stock + :stock_change >= 0
+              AND COALESCE(individual_stock, 0) + :individual_stock_change >= 0
+        """), {
+            'product_id': product.id,
+            'version': version,
+            'name': request.form.get('name'),
+            'description': request.form.get('description'),
+            'category': request.form.get('category'),
+            'purchase_price': purchase_price,
+            'price': price,
+            'low_stock_threshold': low_stock_threshold,
+            'is_packaged': request.form.get('is_packaged') == 'on',
+            'units_per_package': units_per_package,
+            'individual_price': individual_price,
+            'stock_change': stock_change,
+            'individual_stock_change': individual_stock_change
+        })
+        
+        if result.rowcount != 1:
+            # Show the form again with the product as it is now
+            db.session.rollback()
+            if product.version != version:
+                flash(_('This product was changed by someone else while you were editing it. Review the current values and save again.'), 'warning')
+            else:
+                flash(_('Not enough stock to remove that many. Current stock: {0}').format(product.stock), 'danger')
+            return render_template('edit_product.html', product=product)
+        
+        if stock_change or individual_stock_change:
+            record_stock_movement(
+                product.id, reason,
+                quantity_change=stock_change,
+                individual_change=individual_stock_change,
+                user_id=current_user.id
+            )
         
         db.session.commit()
         
@@ -886,6 +1146,44 @@ def delete_product(product_id):
     flash(_('Product deleted successfully!'), 'success')
     return redirect(url_for('manage_products'))
 
+# Number of sales shown per page of the sales listings
+SALES_PAGE_SIZE = 200
+
+def paginate_sales(query, cursor=None, page_size=SALES_PAGE_SIZE):
+    """Return one page of sales, newest first, and the cursor for the next page.
+
+    Pages are keyed on (business_date, date_sold, id) rather than an OFFSET, so
+    every page is an index range scan that starts where the previous one ended.
+    The cursor is None on the last page.
+    """
+    if cursor:
+        try:
+            business_date, date_sold, sale_id = cursor.split(',')
+            key = (
+                datetime.strptime(business_date, '%Y-%m-%d').date(),
+                datetime.fromisoformat(date_sold),
+                int(sale_id)
+            )
+            # The plain business_date bound lets SQLite start the index range
+            # at the cursor's day instead of filtering from the newest sale
+            query = query.filter(
+                Sale.business_date <= key[0],
+                db.tuple_(Sale.business_date, Sale.date_sold, Sale.id) < key
+            )
+        except ValueError:
+            logger.warning(f"Ignoring invalid sales cursor: {cursor}")
+
+    sales = query.order_by(
+        Sale.business_date.desc(), Sale.date_sold.desc(), Sale.id.desc()
+    ).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(sales) > page_size:
+        sales = sales[:page_size]
+        last = sales[-1]
+        next_cursor = f"{last.business_date.isoformat()},{last.date_sold.isoformat()},{last.id}"
+    return sales, next_cursor
+
 @app.route('/admin/sales')
 @login_required
 def view_sales():
@@ -903,77 +1201,62 @@ def view_sales():
     try:
         if start_date_str:
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            start_datetime = datetime.combine(start_date, datetime.min.time())
         else:
             # Default to today (using CAT timezone)
-            cat_timezone = pytz.timezone('Africa/Kigali')
-            today = datetime.now(cat_timezone).date()
-            start_date = today
-            start_datetime = cat_timezone.localize(datetime.combine(start_date, datetime.min.time()))
+            start_date = get_cat_date()
             start_date_str = start_date.strftime('%Y-%m-%d')
             
         if end_date_str:
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            end_datetime = datetime.combine(end_date, datetime.max.time())
         else:
             # Default to today (using CAT timezone)
-            cat_timezone = pytz.timezone('Africa/Kigali')
-            today = datetime.now(cat_timezone).date()
-            end_date = today
-            end_datetime = cat_timezone.localize(datetime.combine(end_date, datetime.max.time()))
+            end_date = get_cat_date()
             end_date_str = end_date.strftime('%Y-%m-%d')
     except ValueError:
         flash(_('Invalid date format. Please use YYYY-MM-DD.'), 'danger')
         return redirect(url_for('view_sales'))
     
-    # Build query - use string-based date comparison for better timezone handling
-    if start_date == end_date:
-        # If viewing a single day, use the more reliable date function
-        logger.debug(f"Filtering admin sales view for single date: {start_date_str}")
-        query = Sale.query.filter(db.func.date(Sale.date_sold) == start_date_str)
-    else:
-        # For date ranges, use between
-        logger.debug(f"Filtering admin sales view from {start_date_str} to {end_date_str}")
-        query = Sale.query.filter(Sale.date_sold.between(start_datetime, end_datetime))
+    # Filter on the stored business date so the range is an index scan
+    logger.debug(f"Filtering admin sales view from {start_date_str} to {end_date_str}")
+    # Load each sale's product and cashier in the same query instead of per row
+    query = Sale.query.join(Sale.product).options(
+        db.contains_eager(Sale.product),
+        db.joinedload(Sale.cashier)
+    ).filter(Sale.business_date.between(start_date, end_date))
     
     if category and category != 'all':
-        query = query.join(Product).filter(Product.category == category)
+        query = query.filter(Sale.category == category)
         
     if cashier_id and cashier_id.isdigit():
         query = query.filter(Sale.cashier_id == int(cashier_id))
     
-    # Execute query
-    sales = query.order_by(Sale.date_sold.desc()).all()
-    
-    # Calculate total revenue
-    total_revenue = sum(sale.total_price for sale in sales)
-    
-    # Calculate total profit
-    total_profit = sum((sale.total_price - (sale.product.purchase_price * sale.quantity)) for sale in sales)
-    
+    # Fetch one page of the listing; the totals below cover the whole range
+    cursor = request.args.get('cursor', '')
+    sales, next_cursor = paginate_sales(query, cursor)
+
+    # Calculate totals and sales by category from the daily rollup
+    summary = get_sales_summary(
+        start_date, end_date,
+        category=category if category != 'all' else None,
+        cashier_id=int(cashier_id) if cashier_id.isdigit() else None
+    )
+    total_revenue = summary['total_revenue']
+    total_profit = summary['total_profit']
+    category_summary = summary['category_summary']
+
     # Get all cashiers for the filter dropdown
     cashiers = User.query.filter_by(role='cashier').all()
     
     # Get all product categories for the filter dropdown
     categories = db.session.query(Product.category).distinct().order_by(Product.category).all()
     categories = [c[0] for c in categories]
-    
-    # Calculate sales by category
-    category_summary = {}
-    for sale in sales:
-        category = sale.product.category
-        if category not in category_summary:
-            category_summary[category] = {
-                'count': 0,
-                'revenue': 0,
-                'profit': 0
-            }
-        category_summary[category]['count'] += sale.quantity
-        category_summary[category]['revenue'] += sale.total_price
-        category_summary[category]['profit'] += (sale.total_price - (sale.product.purchase_price * sale.quantity))
-    
-    return render_template('view_sales.html', 
+
+    # Stream the page so the summary reaches the browser while the rows render
+    return stream_template('view_sales.html',
                            sales=sales, 
+                           cursor=cursor,
+                           next_cursor=next_cursor,
+                           total_sales=summary['transaction_count'],
                            total_revenue=total_revenue,
                            total_profit=total_profit,
                            categories=categories,
@@ -993,9 +1276,14 @@ def delete_sale(sale_id):
     
     sale = Sale.query.get_or_404(sale_id)
     
-    # Return the stock to the product
+    # Return the stock to the column the sale took it from, as logged in the
+    # stock ledger; sales recorded before the ledger came from package stock
     product = sale.product
-    product.stock += sale.quantity
+    individual = bool(db.session.execute(text("""
+        SELECT individual_change FROM stock_movement
+        WHERE product_id = :product_id AND sale_id = :sale_id AND reason = 'sale'
+    """), {'product_id': product.id, 'sale_id': sale.id}).scalar())
+    restore_stock(product.id, sale.quantity, individual=individual)
     
     # Store sale info for flash message
     product_name = sale.product.name
@@ -1003,7 +1291,16 @@ def delete_sale(sale_id):
     sale_date = sale.date_sold.strftime('%Y-%m-%d %H:%M')
     cashier_name = sale.cashier.username
     
-    # Delete the sale
+    # Delete the sale and take it back out of the daily rollup, the month's
+    # profit and the cashier's balance
+    update_daily_sales_summary(sale, sign=-1)
+    update_monthly_profit(sale.business_date or sale.date_sold, -sale.total_price,
+                          -(sale.unit_cost or 0) * sale.quantity, sale_count=-1)
+    update_cashier_balance(sale.cashier_id, -sale.total_price, sale_count=-1, cashed_out=sale.is_cashed_out)
+    record_stock_movement(product.id, 'sale_deleted',
+                          quantity_change=0 if individual else sale.quantity,
+                          individual_change=sale.quantity if individual else 0,
+                          sale_id=sale.id, user_id=current_user.id)
     db.session.delete(sale)
     db.session.commit()
     
@@ -1045,75 +1342,22 @@ def sell_product():
                 # Log the sale attempt for debugging
                 logger.debug(f"Sale attempt: product_id={product_id}, quantity={quantity}, sale_type={sale_type}")
                 
-                # Get the product
-                product = Product.query.get(product_id)
-                if not product:
-                    flash(_('Product not found.'), 'danger')
-                    return redirect(url_for('cashier_dashboard'))
-                
-                # Handle packaged products differently based on sale type
-                if product.is_packaged:
-                    if sale_type == 'package':
-                        # Selling complete packages
-                        if product.stock < quantity:
-                            flash(_('Not enough packages available. Only {0} packages left.', product.stock), 'danger')
-                            return redirect(url_for('cashier_dashboard'))
-                        
-                        # Calculate total price for packages
-                        total_price = product.price * quantity
-                        
-                        # Update package stock
-                        product.stock -= quantity
-                    else:
-                        # Selling individual units
-                        if product.individual_stock < quantity:
-                            flash(_('Not enough individual units available. Only {0} units left.', product.individual_stock), 'danger')
-                            return redirect(url_for('cashier_dashboard'))
-                        
-                        # Calculate total price for individual units
-                        total_price = product.individual_price * quantity
-                        
-                        # Update individual stock
-                        product.individual_stock -= quantity
-                else:
-                    # Regular non-packaged product
-                    if product.stock < quantity:
-                        flash(_('Not enough stock available. Only {0} units left.', product.stock), 'danger')
-                        return redirect(url_for('cashier_dashboard'))
-                    
-                    # Calculate total price
-                    total_price = product.price * quantity
-                    
-                    # Update product stock
-                    product.stock -= quantity
-                
-                # Create sale record with explicit CAT timezone
-                cat_now = get_cat_time()
-                logger.debug(f"Recording sale with CAT timezone: {cat_now}")
-                
-                sale = Sale(
-                    product_id=product_id,
-                    quantity=quantity,
-                    total_price=total_price,
-                    cashier_id=current_user.id,
-                    date_sold=cat_now
-                )
-                
-                # Add and commit the changes to the database
+                # Decrement stock, insert the sale and update the rollups in one transaction
                 try:
-                    db.session.add(sale)
+                    receipt = record_checkout(current_user.id, [{
+                        'product_id': product_id,
+                        'quantity': quantity,
+                        'sale_type': sale_type
+                    }])
                     db.session.commit()
-                    logger.debug(f"Sale recorded successfully: id={sale.id}, product={product.name}, quantity={quantity}, total_price={total_price}")
-                    
-                    # Update monthly profit data
-                    try:
-                        update_monthly_profit(sale)
-                    except Exception as e:
-                        logger.error(f"Error updating monthly profit: {str(e)}")
-                        # Continue even if monthly profit update fails
+                    logger.debug(f"Sale recorded successfully: receipt={receipt.id}, product_id={product_id}, quantity={quantity}, total_price={receipt.total_amount}")
                     
                     flash(_('Sale recorded successfully!'), 'success')
                     return redirect(url_for('cashier_dashboard'))
+                except ValueError as sale_error:
+                    db.session.rollback()
+                    flash(str(sale_error), 'danger')
+                    return redirect(url_for('cashier_dashboard'))
                 except Exception as db_error:
                     db.session.rollback()
                     logger.error(f"Database error recording sale: {str(db_error)}")
@@ -1133,6 +1377,267 @@ def sell_product():
         flash(_('An unexpected error occurred. Please try again.'), 'danger')
         return redirect(url_for('cashier_dashboard'))
 
+@app.route('/cashier/checkout', methods=['POST'])
+@login_required
+def checkout():
+    """Record a whole basket as one receipt in a single transaction"""
+    if current_user.role != 'cashier':
+        flash(_('Access denied. Cashier privileges required.'), 'danger')
+        return redirect(url_for('index'))
+    
+    # The basket arrives as parallel lists, one entry per cart line
+    product_ids = request.form.getlist('product_id')
+    quantities = request.form.getlist('quantity')
+    sale_types = request.form.getlist('sale_type')
+    lines = [
+        {
+            'product_id': product_id,
+            'quantity': quantities[i] if i < len(quantities) else 1,
+            'sale_type': sale_types[i] if i < len(sale_types) else 'package'
+        }
+        for i, product_id in enumerate(product_ids)
+    ]
+    
+    logger.debug(f"Checkout attempt by cashier {current_user.id} with {len(lines)} lines")
+    
+    try:
+        receipt = record_checkout(current_user.id, lines)
+        db.session.commit()
+        logger.debug(f"Checkout recorded: receipt={receipt.id}, lines={len(lines)}, total={receipt.total_amount}")
+        flash(_('Checkout recorded: {0} items, RWF {1:,.0f}').format(receipt.item_count, receipt.total_amount), 'success')
+    except ValueError as sale_error:
+        db.session.rollback()
+        flash(str(sale_error), 'danger')
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Database error recording checkout: {str(e)}")
+        flash(_('Error recording sale. Please try again.'), 'danger')
+    
+    return redirect(url_for('cashier_dashboard'))
+
+# Largest number of sales accepted in one API request
+MAX_API_BATCH_SIZE = 100
+
+@app.route('/api/sales', methods=['POST'])
+def api_submit_sales():
+    """Record a batch of sales sent as JSON by a counter tablet.
+
+    Expects {"sales": [{"idempotency_key": "...", "sold_at": "<ISO time>",
+    "lines": [{"product_id": 1, "quantity": 2, "sale_type": "package"}]}]}.
+    A sale without "lines" is treated as a single line, and sold_at is
+    optional (sales replayed from an offline till keep their original time,
+    if it is within the last MAX_REPLAY_AGE_DAYS days).
+    Each sale becomes one receipt; a key that was already recorded is reported
+    as a duplicate instead of being counted again, so clients can safely
+    retry a whole batch.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    if current_user.role != 'cashier':
+        return jsonify({'error': 'Cashier privileges required'}), 403
+    
+    payload = request.get_json(silent=True) or {}
+    submitted = payload.get('sales')
+    if not isinstance(submitted, list) or not submitted:
+        return jsonify({'error': 'Expected a non-empty "sales" list'}), 400
+    if len(submitted) > MAX_API_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_API_BATCH_SIZE} sales per request'}), 400
+    
+    results = []
+    try:
+        for entry in submitted:
+            if not isinstance(entry, dict):
+                results.append({'status': 'error', 'message': 'Invalid sale'})
+                continue
+            
+            key = entry.get('idempotency_key')
+            if not isinstance(key, str) or not key or len(key) > 64:
+                results.append({'status': 'error', 'message': 'A unique idempotency_key of at most 64 characters is required'})
+                continue
+            
+            existing = Receipt.query.filter_by(idempotency_key=key).first()
+            if existing:
+                results.append({'idempotency_key': key, 'status': 'duplicate', 'receipt_id': existing.id, 'total': existing.total_amount})
+                continue
+            
+            lines = entry.get('lines') if isinstance(entry.get('lines'), list) else [entry]
+            
+            # Each sale gets its own savepoint so one bad sale does not void the batch
+            savepoint = db.session.begin_nested()
+            try:
+                receipt = record_checkout(current_user.id, lines, idempotency_key=key,
+                                          sold_at=parse_client_time(entry.get('sold_at')))
+                savepoint.commit()
+                results.append({'idempotency_key': key, 'status': 'recorded', 'receipt_id': receipt.id, 'total': receipt.total_amount})
+            except ValueError as sale_error:
+                savepoint.rollback()
+                results.append({'idempotency_key': key, 'status': 'error', 'message': str(sale_error)})
+            except IntegrityError:
+                # Another request recorded the same key between our check and insert
+                savepoint.rollback()
+                existing = Receipt.query.filter_by(idempotency_key=key).first()
+                results.append({'idempotency_key': key, 'status': 'duplicate',
+                                'receipt_id': existing.id if existing else None,
+                                'total': existing.total_amount if existing else None})
+            except Exception as sale_error:
+                # Anything else is still this sale's problem, not the batch's
+                savepoint.rollback()
+                logger.error(f"Error recording API sale {key}: {str(sale_error)}", exc_info=True)
+                results.append({'idempotency_key': key, 'status': 'error', 'message': 'Invalid sale'})
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Database error recording API sales: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Error recording sales. Please retry the batch.'}), 500
+    
+    logger.debug(f"API batch from cashier {current_user.id}: {len(results)} sales processed")
+    return jsonify({'results': results})
+
+def sellable_products_query():
+    """Base query for products a cashier can sell, with the catalog columns only"""
+    return db.session.query(
+        Product.id, Product.name, Product.category, Product.price, Product.stock,
+        Product.is_packaged, Product.units_per_package, Product.individual_price, Product.individual_stock
+    ).filter(
+        db.or_(Product.stock > 0, db.and_(Product.is_packaged == True, Product.individual_stock > 0))
+    )
+
+def product_to_dict(row):
+    """Convert a catalog row into the JSON shape used by the cashier tills"""
+    return {
+        'id': row.id,
+        'name': row.name,
+        'category': row.category,
+        'price': row.price,
+        'stock': row.stock,
+        'is_packaged': bool(row.is_packaged),
+        'units_per_package': row.units_per_package,
+        'individual_price': row.individual_price,
+        'individual_stock': row.individual_stock
+    }
+
+def ensure_product_search_index():
+    """Create the product full-text index and its triggers if they are missing"""
+    try:
+        inspector = db.inspect(db.engine)
+        created = 'product_fts' not in inspector.get_table_names()
+        with db.engine.begin() as conn:
+            for statement in PRODUCT_SEARCH_DDL:
+                conn.execute(text(statement))
+            if created:
+                # Index the products that existed before the table did
+                conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+                logger.info("Created product full-text search index")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating product search index: {str(e)}")
+        return False
+
+def product_match_expression(term):
+    """Turn free text into an FTS5 query matching every word as a prefix.
+
+    Each word is quoted so punctuation typed by the user can never be read as
+    FTS5 query syntax. Returns None when the text contains no words.
+    """
+    words = re.findall(r'\w+', term)
+    if not words:
+        return None
+    return ' '.join('"{0}"*'.format(word) for word in words)
+
+def product_search_ranking(term):
+    """Ranked product ids matching term, as a subquery to join against product.
+
+    Name matches weigh more than category matches, which weigh more than
+    description matches. Returns None when term has no searchable words.
+    """
+    match = product_match_expression(term)
+    if match is None:
+        return None
+    return text(
+        "SELECT rowid AS product_id, bm25(product_fts, 10.0, 1.0, 2.0) AS rank "
+        "FROM product_fts WHERE product_fts MATCH :match"
+    ).bindparams(match=match).columns(
+        product_id=db.Integer, rank=db.Float
+    ).subquery('product_search')
+
+def search_products(term, limit=10):
+    """Return up to limit sellable products matching term, best matches first.
+
+    Uses the full-text index, so every word typed matches the start of a word
+    in the name, category or description. Falls back to a name LIKE search
+    when the index is not available.
+    """
+    ranking = product_search_ranking(term)
+    if ranking is None:
+        return []
+    try:
+        return sellable_products_query().join(
+            ranking, ranking.c.product_id == Product.id
+        ).order_by(ranking.c.rank, Product.name).limit(limit).all()
+    except OperationalError as e:
+        logger.warning(f"Full-text product search unavailable, using LIKE search: {str(e)}")
+        return search_products_by_name(term, limit)
+
+def search_products_by_name(term, limit=10):
+    """Return up to limit sellable products whose name matches term.
+
+    Name prefix matches come first and are served by the NOCASE name index;
+    substring matches fill any remaining slots.
+    """
+    # Escape LIKE wildcards typed by the cashier
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    prefix = escaped + '%'
+    name_order = db.collate(Product.name, 'NOCASE')
+
+    matches = sellable_products_query().filter(
+        Product.name.like(prefix, escape='\\')
+    ).order_by(name_order).limit(limit).all()
+
+    if len(matches) < limit:
+        matches += sellable_products_query().filter(
+            Product.name.like('%' + escaped + '%', escape='\\'),
+            ~Product.name.like(prefix, escape='\\')
+        ).order_by(name_order).limit(limit - len(matches)).all()
+
+    return matches
+
+@app.route('/api/products')
+def api_products():
+    """Return the sellable product catalog as JSON for the cashier tills"""
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    rows = sellable_products_query().order_by(Product.name).all()
+    return jsonify({'products': [product_to_dict(row) for row in rows]})
+
+# Largest number of matches returned to the product picker
+MAX_SEARCH_RESULTS = 25
+
+@app.route('/api/products/search')
+def api_search_products():
+    """Return the top matches for the cashier product picker as the cashier types"""
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    term = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), MAX_SEARCH_RESULTS)
+    except ValueError:
+        limit = 10
+    
+    if not term:
+        return jsonify({'products': []})
+    
+    return jsonify({'products': [product_to_dict(row) for row in search_products(term, limit)]})
+
+@app.route('/service-worker.js')
+def service_worker():
+    """Serve the offline service worker from the site root so it can control every page"""
+    response = app.send_static_file('js/service-worker.js')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/cashier/sales')
 @login_required
 def view_cashier_sales():
@@ -1154,59 +1659,59 @@ def view_cashier_sales():
     # If no date filters provided, default to today's sales
     if not start_date_str and not end_date_str:
         # Get today's date in CAT timezone
-        cat_timezone = pytz.timezone('Africa/Kigali')
-        today = datetime.now(cat_timezone).date()
+        today = get_cat_date()
         start_date_str = today.strftime('%Y-%m-%d')
         end_date_str = today.strftime('%Y-%m-%d')
     
-    # Base query - only show sales by the current cashier
-    query = Sale.query.filter(Sale.cashier_id == current_user.id)
+    # Base query - only show sales by the current cashier, with each product
+    # loaded in the same query
+    query = Sale.query.join(Sale.product).options(
+        db.contains_eager(Sale.product)
+    ).filter(Sale.cashier_id == current_user.id)
     
     # Apply date filters if provided
+    first_date = datetime.min.date()
+    last_date = datetime.max.date()
     if start_date_str:
         try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-            query = query.filter(Sale.date_sold >= start_date)
+            first_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            query = query.filter(Sale.business_date >= first_date)
         except ValueError:
             flash(_('Invalid start date format. Please use YYYY-MM-DD.'), 'warning')
     
     if end_date_str:
         try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-            # Add one day to include the end date
-            end_date = datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59)
-            query = query.filter(Sale.date_sold <= end_date)
+            last_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+            query = query.filter(Sale.business_date <= last_date)
         except ValueError:
             flash(_('Invalid end date format. Please use YYYY-MM-DD.'), 'warning')
     
     # Apply category filter if provided
     if category and category != 'all':
-        query = query.join(Product).filter(Product.category == category)
+        query = query.filter(Sale.category == category)
     
-    # Get all sales based on the filters
-    sales = query.order_by(Sale.date_sold.desc()).all()
+    # Get one page of sales based on the filters
+    cursor = request.args.get('cursor', '')
+    sales, next_cursor = paginate_sales(query, cursor)
     
-    # Calculate total revenue
-    total_revenue = sum(sale.total_price for sale in sales)
+    # Calculate total revenue and the per-category summary from the daily rollup
+    summary = get_sales_summary(
+        first_date, last_date,
+        category=category if category != 'all' else None,
+        cashier_id=current_user.id
+    )
+    total_revenue = summary['total_revenue']
+    category_summary = summary['category_summary']
     
     # Get unique categories for the filter dropdown
     categories = db.session.query(Product.category).distinct().all()
     categories = [cat[0] for cat in categories]
     
-    # Group sales by category for the summary
-    category_summary = {}
-    for sale in sales:
-        category = sale.product.category
-        if category not in category_summary:
-            category_summary[category] = {
-                'count': 0,
-                'revenue': 0
-            }
-        category_summary[category]['count'] += sale.quantity
-        category_summary[category]['revenue'] += sale.total_price
-    
-    return render_template('cashier_sales.html', 
+    return stream_template('cashier_sales.html', 
                            sales=sales, 
+                           cursor=cursor,
+                           next_cursor=next_cursor,
+                           total_sales=summary['transaction_count'],
                            total_revenue=total_revenue,
                            categories=categories,
                            category_summary=category_summary,
@@ -1214,11 +1719,127 @@ def view_cashier_sales():
                            start_date=start_date_str,
                            end_date=end_date_str)
 
+# Rows fetched from the database per batch while exporting
+EXPORT_BATCH_SIZE = 500
+
+SALES_EXPORT_HEADER = [
+    'Sale ID', 'Receipt ID', 'Date Sold', 'Business Date', 'Product', 'Category', 'Quantity',
+    'Unit Price', 'Total Price', 'Cost', 'Profit', 'Cashier'
+]
+
+PRODUCT_EXPORT_HEADER = [
+    'Product ID', 'Name', 'Description', 'Category', 'Purchase Price', 'Price', 'Stock',
+    'Low Stock Threshold', 'Packaged', 'Units Per Package', 'Individual Price', 'Individual Stock'
+]
+
+def iter_sales_export(start_date, end_date, category=None, cashier_id=None):
+    """Yield sale export rows for a business date range, oldest first.
+
+    Rows are read from the cursor in batches of EXPORT_BATCH_SIZE, so memory
+    stays flat however long the range is.
+    """
+    cost = db.func.coalesce(Sale.unit_cost, 0) * Sale.quantity
+    query = db.select(
+        Sale.id, Sale.receipt_id, Sale.date_sold, Sale.business_date, Product.name, Sale.category,
+        Sale.quantity, Sale.unit_price, Sale.total_price, cost, Sale.total_price - cost, User.username
+    ).join(Product, Product.id == Sale.product_id).join(
+        User, User.id == Sale.cashier_id
+    ).where(
+        Sale.business_date.between(start_date, end_date)
+    ).order_by(Sale.business_date, Sale.date_sold, Sale.id)
+
+    if category:
+        query = query.where(Sale.category == category)
+    if cashier_id:
+        query = query.where(Sale.cashier_id == cashier_id)
+
+    result = db.session.execute(query, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+    for row in result:
+        yield row
+
+def iter_products_export():
+    """Yield product catalog export rows in name order, in batches"""
+    query = db.select(
+        Product.id, Product.name, Product.description, Product.category, Product.purchase_price,
+        Product.price, Product.stock, Product.low_stock_threshold, Product.is_packaged,
+        Product.units_per_package, Product.individual_price, Product.individual_stock
+    ).order_by(Product.name)
+
+    result = db.session.execute(query, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+    for row in result:
+        yield row
+
+def iter_csv(header, rows):
+    """Encode rows as CSV text, yielding one chunk per batch of rows.
+
+    Starts with a UTF-8 byte order mark so Excel opens product names with
+    accented characters correctly.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def csv_download(chunks, filename):
+    """Stream CSV chunks to the browser as a file download"""
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.route('/admin/sales/export')
+@login_required
+def export_sales():
+    """Download the sales matching the sales report filters as CSV"""
+    if current_user.role != 'admin':
+        flash(_('Access denied. Admin privileges required.'), 'danger')
+        return redirect(url_for('index'))
+    
+    category = request.args.get('category', '')
+    cashier_id = request.args.get('cashier_id', '')
+    try:
+        today = get_cat_date()
+        start_date_str = request.args.get('start_date') or today.strftime('%Y-%m-%d')
+        end_date_str = request.args.get('end_date') or today.strftime('%Y-%m-%d')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    except ValueError:
+        flash(_('Invalid date format. Please use YYYY-MM-DD.'), 'danger')
+        return redirect(url_for('view_sales'))
+    
+    rows = iter_sales_export(
+        start_date, end_date,
+        category=category if category and category != 'all' else None,
+        cashier_id=int(cashier_id) if cashier_id.isdigit() else None
+    )
+    logger.info(f"Sales export from {start_date_str} to {end_date_str} requested by {current_user.username}")
+    return csv_download(iter_csv(SALES_EXPORT_HEADER, rows), f'sales_{start_date_str}_{end_date_str}.csv')
+
+@app.route('/admin/products/export')
+@login_required
+def export_products():
+    """Download the product catalog as CSV"""
+    if current_user.role != 'admin':
+        flash(_('Access denied. Admin privileges required.'), 'danger')
+        return redirect(url_for('index'))
+    
+    filename = f"products_{get_cat_date().strftime('%Y-%m-%d')}.csv"
+    return csv_download(iter_csv(PRODUCT_EXPORT_HEADER, iter_products_export()), filename)
+
 # Initialize the database and create an admin user
 @app.cli.command('init-db')
 def init_db_command():
     """Initialize the database and create admin and cashier users if they don't exist."""
     db.create_all()
+    ensure_product_search_index()
     
     # Check if admin user exists
     admin = User.query.filter_by(username='admin').first()
@@ -1242,137 +1863,556 @@ def init_db_command():
     else:
         print('Cashier user already exists')
 
-# Function to update monthly profit data when a sale is made
-def update_monthly_profit(sale):
-    """Update monthly profit data when a sale is made"""
+@app.cli.command('rebuild-sales-summary')
+def rebuild_sales_summary_command():
+    """Rebuild the daily sales summary table from the sale history."""
+    db.create_all()
+    if rebuild_daily_sales_summary():
+        print('Daily sales summary rebuilt successfully')
+    else:
+        print('Failed to rebuild daily sales summary. Check app.log for details.')
+
+@app.cli.command('export-sales')
+@click.option('--start-date', required=True, help='First business date, YYYY-MM-DD.')
+@click.option('--end-date', required=True, help='Last business date, YYYY-MM-DD.')
+@click.option('--category', default=None, help='Only export this product category.')
+@click.option('--cashier-id', type=int, default=None, help='Only export sales by this cashier.')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='CSV file to write (default: stdout).')
+def export_sales_command(start_date, end_date, category, cashier_id, output):
+    """Export sales in a business date range to CSV."""
+    try:
+        first_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise click.BadParameter('Dates must use the YYYY-MM-DD format.')
+    rows = iter_sales_export(first_date, last_date, category=category, cashier_id=cashier_id)
+    for chunk in iter_csv(SALES_EXPORT_HEADER, rows):
+        output.write(chunk)
+
+@app.cli.command('export-products')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='CSV file to write (default: stdout).')
+def export_products_command(output):
+    """Export the product catalog to CSV."""
+    for chunk in iter_csv(PRODUCT_EXPORT_HEADER, iter_products_export()):
+        output.write(chunk)
+
+@app.cli.command('snapshot-stock')
+def snapshot_stock_command():
+    """Snapshot every product's stock; schedule this daily to keep stock reports fast."""
+    db.create_all()
+    if take_stock_snapshot():
+        print('Stock snapshot taken successfully')
+    else:
+        print('Failed to take a stock snapshot. Check app.log for details.')
+
+# Each quantity is reported twice: packages (or plain units) and the loose
+# individual units of packaged products, which are counted separately
+STOCK_REPORT_HEADER = ['Product', 'Category',
+                       'Opening Stock', 'Opening Individual Stock',
+                       'Added', 'Added Individual',
+                       'Sold', 'Sold Individual',
+                       'Adjusted', 'Adjusted Individual',
+                       'Closing Stock', 'Closing Individual Stock']
+
+@app.cli.command('stock-report')
+@click.option('--start-date', required=True, help='First business date, YYYY-MM-DD.')
+@click.option('--end-date', required=True, help='Last business date, YYYY-MM-DD.')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='CSV file to write (default: stdout).')
+def stock_report_command(start_date, end_date, output):
+    """Reconcile each product's stock over a business date range to CSV.
+
+    For both stock and individual stock, opening + added - sold + adjusted
+    equals closing. Negative adjustments are stock lost to breakage, theft
+    or miscounts.
+    """
+    try:
+        first_date = datetime.strptime(start_date, '%Y-%m-%d')
+        last_date = datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        raise click.BadParameter('Dates must use the YYYY-MM-DD format.')
+    opening_at = first_date - timedelta(microseconds=1)
+    closing_at = last_date + timedelta(days=1) - timedelta(microseconds=1)
+    opening = get_stock_levels(opening_at)
+    closing = get_stock_levels(closing_at)
+    changes = get_stock_changes(opening_at, closing_at)
+
+    def change(product_id, *reasons):
+        """Total (stock, individual stock) change of a product for the given reasons"""
+        product_changes = changes.get(product_id, {})
+        totals = [product_changes.get(reason, (0, 0)) for reason in reasons]
+        return sum(total[0] for total in totals), sum(total[1] for total in totals)
+
+    def rows():
+        for product in Product.query.order_by(Product.name):
+            added = change(product.id, 'added', 'received', 'import')
+            sold = change(product.id, 'sale', 'sale_deleted')
+            adjusted = change(product.id, 'adjustment')
+            yield [
+                product.name,
+                product.category,
+                *opening.get(product.id, (0, 0)),
+                *added,
+                -sold[0], -sold[1],
+                *adjusted,
+                *closing.get(product.id, (0, 0))
+            ]
+
+    for chunk in iter_csv(STOCK_REPORT_HEADER, rows()):
+        output.write(chunk)
+
+# Function to take sold items off the shelf without a read-check-write race
+def decrement_stock(product_id, quantity, individual=False):
+    """Decrement a product's stock in a single conditional UPDATE.
+
+    Individual-unit sales of packaged products draw from individual_stock,
+    all other sales from stock. The row is only changed when enough stock
+    remains, so two cashiers selling the last units cannot both succeed.
+    Returns True if the stock was decremented. Runs in the caller's
+    transaction.
+    """
+    column = 'individual_stock' if individual else 'stock'
+    result = db.session.execute(text(f"""
+        UPDATE product
+        SET {column} = {column} - :quantity
+        WHERE id = :product_id AND {column} >= :quantity
+    """), {'product_id': product_id, 'quantity': quantity})
+    return result.rowcount == 1
+
+def restore_stock(product_id, quantity, individual=False):
+    """Put sold items back on the shelf with a relative UPDATE.
+
+    Adds to individual_stock or stock, whichever the sale drew from, so a
+    concurrent decrement_stock is never overwritten. Runs in the caller's
+    transaction.
+    """
+    column = 'individual_stock' if individual else 'stock'
+    db.session.execute(text(f"""
+        UPDATE product
+        SET {column} = COALESCE({column}, 0) + :quantity
+        WHERE id = :product_id
+    """), {'product_id': product_id, 'quantity': quantity})
+
+# Function to log a stock change next to the UPDATE that makes it
+def record_stock_movement(product_id, reason, quantity_change=0, individual_change=0,
+                          sale_id=None, user_id=None, created_at=None):
+    """Append a change of a product's stock to the stock_movement ledger.
+
+    Runs in the caller's transaction, so the movement is committed together
+    with the stock change it describes; the caller is responsible for the commit.
+    """
+    db.session.execute(text("""
+        INSERT INTO stock_movement
+            (product_id, quantity_change, individual_change, reason, sale_id, user_id, created_at)
+        VALUES (:product_id, :quantity_change, :individual_change, :reason, :sale_id, :user_id, :created_at)
+    """), {
+        'product_id': product_id,
+        'quantity_change': quantity_change,
+        'individual_change': individual_change,
+        'reason': reason,
+        'sale_id': sale_id,
+        'user_id': user_id,
+        'created_at': (created_at or get_cat_time()).strftime('%Y-%m-%d %H:%M:%S.%f')
+    })
+
+def take_stock_snapshot():
+    """Snapshot every product's stock so later stock queries start from here"""
     try:
-        # Ensure the monthly_profit table exists
+        # One statement, so the stock and the last movement id are read together
+        result = db.session.execute(text("""
+            INSERT INTO stock_snapshot (product_id, taken_at, stock, individual_stock, last_movement_id)
+            SELECT id, :taken_at, COALESCE(stock, 0), COALESCE(individual_stock, 0),
+                   (SELECT COALESCE(MAX(id), 0) FROM stock_movement)
+            FROM product
+        """), {'taken_at': get_cat_time().strftime('%Y-%m-%d %H:%M:%S.%f')})
+        db.session.commit()
+        logger.info(f"Took a stock snapshot of {result.rowcount} products")
+        return True
+    except Exception as e:
+        logger.error(f"Error taking stock snapshot: {str(e)}")
+        db.session.rollback()
+        return False
+
+def get_stock_levels(at):
+    """Return {product_id: (stock, individual_stock)} as of the CAT time at.
+
+    Each product starts from its latest snapshot taken by then and adds the
+    movements logged after it, so the cost does not grow with the history.
+    Products without an earlier snapshot are summed from their first movement.
+    """
+    rows = db.session.execute(text("""
+        SELECT p.id,
+               COALESCE(s.stock, 0) + COALESCE(SUM(m.quantity_change), 0),
+               COALESCE(s.individual_stock, 0) + COALESCE(SUM(m.individual_change), 0)
+        FROM product p
+        LEFT JOIN stock_snapshot s ON s.id = (
+            SELECT id FROM stock_snapshot
+            WHERE product_id = p.id AND taken_at <= :at
+            ORDER BY taken_at DESC
+            LIMIT 1
+        )
+        LEFT JOIN stock_movement m ON m.product_id = p.id
+            AND m.id > COALESCE(s.last_movement_id, 0)
+            AND m.created_at <= :at
+        GROUP BY p.id
+    """), {'at': at.strftime('%Y-%m-%d %H:%M:%S.%f')})
+    return {product_id: (stock, individual_stock) for product_id, stock, individual_stock in rows}
+
+def get_stock_changes(start, end):
+    """Sum stock movements per product and reason between two CAT times"""
+    rows = db.session.execute(text("""
+        SELECT product_id, reason, SUM(quantity_change), SUM(individual_change)
+        FROM stock_movement
+        WHERE created_at > :start AND created_at <= :end
+        GROUP BY product_id, reason
+    """), {
+        'start': start.strftime('%Y-%m-%d %H:%M:%S.%f'),
+        'end': end.strftime('%Y-%m-%d %H:%M:%S.%f')
+    })
+    changes = {}
+    for product_id, reason, quantity_change, individual_change in rows:
+        changes.setdefault(product_id, {})[reason] = (quantity_change, individual_change)
+    return changes
+
+# Function to record a whole basket of sale lines as one receipt
+def record_checkout(cashier_id, lines, idempotency_key=None, sold_at=None):
+    """Record sale lines as a receipt header plus one Sale row per line.
+
+    Each line is a dict with product_id, quantity and sale_type keys. Stock is
+    decremented once per product and sale type with a conditional UPDATE, and
+    monthly profit is updated once for the whole basket. Everything runs in the
+    caller's transaction: the caller commits, or rolls back when a ValueError
+    with a user-facing message is raised for an invalid or out of stock line.
+    sold_at overrides the sale time for sales replayed from an offline till.
+    """
+    if not lines:
+        raise ValueError(_('Please select a product.'))
+
+    parsed_lines = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise ValueError(_('Please select a product.'))
         try:
-            db.session.execute(db.text("SELECT 1 FROM monthly_profit LIMIT 1"))
-        except Exception as e:
-            if 'no such table' in str(e).lower():
-                logger.warning("monthly_profit table does not exist, creating it now")
-                with app.app_context():
-                    db.create_all()
-            else:
-                logger.error(f"Database error checking for monthly_profit table: {str(e)}")
-                raise
-        
-        # Get the year and month from the sale date
-        year = sale.date_sold.year
-        month = sale.date_sold.month
-        
-        # Calculate the profit for this sale
-        purchase_price = sale.product.purchase_price or 0
-        cost = purchase_price * sale.quantity
-        profit = sale.total_price - cost
-        
-        # Find or create the monthly profit record
-        monthly_profit = MonthlyProfit.query.filter_by(year=year, month=month).first()
-        
-        if monthly_profit:
-            # Update existing record
-            monthly_profit.total_revenue += sale.total_price
-            monthly_profit.total_cost += cost
-            monthly_profit.total_profit += profit
-            monthly_profit.sale_count += 1
-        else:
-            # Create new record
-            monthly_profit = MonthlyProfit(
-                year=year,
-                month=month,
-                total_revenue=sale.total_price,
-                total_cost=cost,
-                total_profit=profit,
-                sale_count=1
-            )
-            db.session.add(monthly_profit)
-        
+            product_id = int(line.get('product_id'))
+        except (TypeError, ValueError):
+            raise ValueError(_('Please select a product.'))
+        try:
+            quantity = int(line.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise ValueError(_('Please enter a valid quantity.'))
+        if quantity <= 0:
+            raise ValueError(_('Please enter a valid quantity.'))
+        parsed_lines.append((product_id, quantity, line.get('sale_type') or 'package'))
+
+    # Load every product in the basket with one query
+    product_ids = {product_id for product_id, _quantity, _sale_type in parsed_lines}
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+    # All lines of a receipt share the same timestamp (CAT timezone)
+    cat_now = sold_at or get_cat_time()
+    receipt = Receipt(cashier_id=cashier_id, created_at=cat_now, total_amount=0.0, item_count=0,
+                      idempotency_key=idempotency_key)
+
+    sale_lines = []
+    decrements = {}
+    for product_id, quantity, sale_type in parsed_lines:
+        product = products.get(product_id)
+        if not product:
+            raise ValueError(_('Product not found.'))
+
+        # Packaged products sold per unit draw from individual_stock,
+        # everything else from the package/unit stock
+        individual = bool(product.is_packaged) and sale_type != 'package'
+        unit_price = product.individual_price if individual else product.price
+        unit_cost = product.purchase_price or 0
+        if individual:
+            # purchase_price is per package; spread it over the units in it
+            unit_cost = unit_cost / max(product.units_per_package or 1, 1)
+        decrements[(product, individual)] = decrements.get((product, individual), 0) + quantity
+
+        sale = Sale(
+            product_id=product.id,
+            quantity=quantity,
+            unit_price=unit_price,
+            unit_cost=unit_cost,
+            category=product.category or 'Uncategorized',
+            total_price=unit_price * quantity,
+            cashier_id=cashier_id,
+            date_sold=cat_now,
+            business_date=cat_now.date(),
+            receipt=receipt
+        )
+        sale_lines.append((sale, product, individual))
+        receipt.total_amount += sale.total_price
+        receipt.item_count += quantity
+
+    # Take the stock off the shelf, one conditional UPDATE per product
+    for (product, individual), quantity in decrements.items():
+        if not decrement_stock(product.id, quantity, individual=individual):
+            if individual:
+                raise ValueError(_('Not enough individual units available. Only {0} units left.').format(product.individual_stock))
+            elif product.is_packaged:
+                raise ValueError(_('Not enough packages available. Only {0} packages left.').format(product.stock))
+            raise ValueError(_('Not enough stock available. Only {0} units left.').format(product.stock))
+
+    db.session.add(receipt)
+    total_cost = 0
+    for sale, product, individual in sale_lines:
+        db.session.add(sale)
+        update_daily_sales_summary(sale)
+        total_cost += sale.unit_cost * sale.quantity
+
+    update_monthly_profit(cat_now, receipt.total_amount, total_cost, sale_count=len(sale_lines))
+    update_cashier_balance(cashier_id, receipt.total_amount, sale_count=len(sale_lines))
+    db.session.flush()
+
+    # Log the stock taken by each line against its sale
+    for sale, product, individual in sale_lines:
+        record_stock_movement(
+            product.id, 'sale',
+            quantity_change=0 if individual else -sale.quantity,
+            individual_change=-sale.quantity if individual else 0,
+            sale_id=sale.id, user_id=cashier_id, created_at=cat_now
+        )
+    return receipt
+
+# Function to keep the daily sales rollup in step with the sale table
+def update_daily_sales_summary(sale, sign=1):
+    """Add a sale to the daily sales summary, or remove it with sign=-1.
+
+    The sale is counted under the category stored on it, not the product's
+    current one. Runs in the caller's transaction; the caller is responsible
+    for the commit.
+    """
+    cost = (sale.unit_cost or 0) * sale.quantity
+    db.session.execute(text("""
+        INSERT INTO daily_sales_summary
+            (business_date, category, cashier_id, quantity, revenue, cost, transaction_count)
+        VALUES (:business_date, :category, :cashier_id, :quantity, :revenue, :cost, :transaction_count)
+        ON CONFLICT(business_date, category, cashier_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = revenue + excluded.revenue,
+            cost = cost + excluded.cost,
+            transaction_count = transaction_count + excluded.transaction_count
+    """), {
+        'business_date': sale.business_date.isoformat(),
+        'category': sale.category or 'Uncategorized',
+        'cashier_id': sale.cashier_id,
+        'quantity': sign * sale.quantity,
+        'revenue': sign * sale.total_price,
+        'cost': sign * cost,
+        'transaction_count': sign
+    })
+
+# Function to keep the per-cashier balances in step with the sale table
+def update_cashier_balance(cashier_id, revenue, sale_count=1, cashed_out=False):
+    """Add revenue for sale_count sales to a cashier's balance.
+
+    Pass negative amounts to take sales back out. Sales that were already
+    cashed out only change the lifetime revenue. Runs in the caller's
+    transaction; the caller is responsible for the commit.
+    """
+    uncashed_revenue = 0 if cashed_out else revenue
+    uncashed_count = 0 if cashed_out else sale_count
+    db.session.execute(text("""
+        INSERT INTO cashier_balance
+            (cashier_id, lifetime_revenue, uncashed_revenue, uncashed_count)
+        VALUES (:cashier_id, :revenue, :uncashed_revenue, :uncashed_count)
+        ON CONFLICT(cashier_id) DO UPDATE SET
+            lifetime_revenue = lifetime_revenue + excluded.lifetime_revenue,
+            uncashed_revenue = uncashed_revenue + excluded.uncashed_revenue,
+            uncashed_count = uncashed_count + excluded.uncashed_count
+    """), {
+        'cashier_id': cashier_id,
+        'revenue': revenue,
+        'uncashed_revenue': uncashed_revenue,
+        'uncashed_count': uncashed_count
+    })
+
+def rebuild_cashier_balances():
+    """Rebuild every cashier's balance from the full sale history"""
+    try:
+        db.session.execute(text("DELETE FROM cashier_balance"))
+        db.session.execute(text("""
+            INSERT INTO cashier_balance
+                (cashier_id, lifetime_revenue, uncashed_revenue, uncashed_count)
+            SELECT cashier_id,
+                   SUM(total_price),
+                   SUM(CASE WHEN is_cashed_out = 0 THEN total_price ELSE 0 END),
+                   SUM(CASE WHEN is_cashed_out = 0 THEN 1 ELSE 0 END)
+            FROM sale
+            GROUP BY cashier_id
+        """))
         db.session.commit()
-        logger.info(f"Updated monthly profit for {year}-{month}")
+        logger.info("Rebuilt cashier balances from sales data")
+        return True
     except Exception as e:
-        logger.error(f"Error updating monthly profit: {str(e)}")
+        logger.error(f"Error rebuilding cashier balances: {str(e)}")
         db.session.rollback()
+        return False
+
+def rebuild_daily_sales_summary():
+    """Rebuild the daily sales summary from the full sale history"""
+    try:
+        db.session.execute(text("DELETE FROM daily_sales_summary"))
+        db.session.execute(text("""
+            INSERT INTO daily_sales_summary
+                (business_date, category, cashier_id, quantity, revenue, cost, transaction_count)
+            SELECT business_date,
+                   COALESCE(category, 'Uncategorized'),
+                   cashier_id,
+                   SUM(quantity),
+                   SUM(total_price),
+                   SUM(COALESCE(unit_cost, 0) * quantity),
+                   COUNT(*)
+            FROM sale
+            GROUP BY business_date, COALESCE(category, 'Uncategorized'), cashier_id
+        """))
+        db.session.commit()
+        logger.info("Rebuilt daily sales summary from sales data")
+        return True
+    except Exception as e:
+        logger.error(f"Error rebuilding daily sales summary: {str(e)}")
+        db.session.rollback()
+        return False
+
+def get_sales_summary(start_date, end_date, category=None, cashier_id=None):
+    """Summarize sales between two business dates (inclusive) from the daily rollup"""
+    query = db.session.query(
+        DailySalesSummary.category,
+        db.func.sum(DailySalesSummary.quantity),
+        db.func.sum(DailySalesSummary.revenue),
+        db.func.sum(DailySalesSummary.cost),
+        db.func.sum(DailySalesSummary.transaction_count)
+    ).filter(DailySalesSummary.business_date.between(start_date, end_date))
+
+    if category:
+        query = query.filter(DailySalesSummary.category == category)
+    if cashier_id:
+        query = query.filter(DailySalesSummary.cashier_id == cashier_id)
+
+    category_summary = {}
+    for row_category, quantity, revenue, cost, transactions in query.group_by(DailySalesSummary.category).all():
+        if not transactions:
+            continue
+        category_summary[row_category] = {
+            'count': quantity,
+            'revenue': revenue,
+            'profit': revenue - cost,
+            'transactions': transactions
+        }
+
+    return {
+        'total_revenue': sum(c['revenue'] for c in category_summary.values()),
+        'total_profit': sum(c['profit'] for c in category_summary.values()),
+        'transaction_count': sum(c['transactions'] for c in category_summary.values()),
+        'category_summary': category_summary
+    }
+
+def get_period_profits(start_day=1):
+    """Group the daily rollup into accounting periods that begin on start_day.
+
+    Shifting each business date back by (start_day - 1) days lands it in the
+    calendar month of its accounting period, e.g. with start_day=15 the 14th
+    of March belongs to the February period.
+    """
+    return db.session.execute(text("""
+        SELECT CAST(strftime('%Y', business_date, :shift) AS INTEGER) AS year,
+               CAST(strftime('%m', business_date, :shift) AS INTEGER) AS month,
+               SUM(revenue) AS total_revenue,
+               SUM(cost) AS total_cost,
+               SUM(revenue - cost) AS total_profit,
+               SUM(transaction_count) AS sale_count
+        FROM daily_sales_summary
+        GROUP BY year, month
+        HAVING SUM(transaction_count) > 0
+        ORDER BY year DESC, month DESC
+    """), {'shift': f'-{start_day - 1} days'}).all()
+
+# Function to update monthly profit data when sales are made
+def update_monthly_profit(sale_date, revenue, cost, sale_count=1):
+    """Add revenue and cost for sale_count sales to the month of sale_date.
+
+    A single UPSERT, so concurrent sales cannot overwrite each other's
+    increments. Runs in the caller's transaction so the sales and their profit
+    are committed together; the caller is responsible for the commit and any
+    rollback.
+    """
+    db.session.execute(text("""
+        INSERT INTO monthly_profit
+            (year, month, total_revenue, total_cost, total_profit, sale_count)
+        VALUES (:year, :month, :revenue, :cost, :profit, :sale_count)
+        ON CONFLICT(year, month) DO UPDATE SET
+            total_revenue = total_revenue + excluded.total_revenue,
+            total_cost = total_cost + excluded.total_cost,
+            total_profit = total_profit + excluded.total_profit,
+            sale_count = sale_count + excluded.sale_count
+    """), {
+        'year': sale_date.year,
+        'month': sale_date.month,
+        'revenue': revenue,
+        'cost': cost,
+        'profit': revenue - cost,
+        'sale_count': sale_count
+    })
+    
+    logger.debug(f"Updated monthly profit for {sale_date.year}-{sale_date.month}")
 
 # Function to recalculate all monthly profits from sales data
 def recalculate_monthly_profits(start_day=1):
+    """Rebuild the monthly_profit table from the sale table in SQL.
+
+    Sales are grouped into accounting periods that begin on start_day by
+    shifting each business date back (start_day - 1) days, the same rule as
+    get_period_profits. The history is processed one year of periods at a
+    time, each in its own transaction, so a very long history never holds
+    the database lock for the whole rebuild and no sale rows reach Python.
+    """
     try:
         # Validate start_day
         if not isinstance(start_day, int) or start_day < 1 or start_day > 28:
             start_day = 1  # Default to 1 if invalid
             
         logger.debug(f"Recalculating monthly profits with accounting period starting on day {start_day}")
+        shift = f'-{start_day - 1} days'
         
-        # Clear existing monthly profit data
-        MonthlyProfit.query.delete()
-        db.session.commit()
-        
-        # Get all sales ordered by date
-        sales = Sale.query.order_by(Sale.date_sold).all()
+        first_year, last_year = db.session.execute(text("""
+            SELECT CAST(strftime('%Y', MIN(business_date), :shift) AS INTEGER),
+                   CAST(strftime('%Y', MAX(business_date), :shift) AS INTEGER)
+            FROM sale
+        """), {'shift': shift}).one()
         
-        if not sales:
+        if first_year is None:
             logger.info("No sales found to calculate profits from")
+            MonthlyProfit.query.delete()
+            db.session.commit()
             return True
-            
-        # Group sales by accounting periods based on start_day
-        # For example, if start_day is 15, periods are from 15th to 14th of next month
-        accounting_periods = {}
-        
-        for sale in sales:
-            sale_date = sale.date_sold.date()
-            # Determine the accounting period this sale belongs to
-            if sale_date.day >= start_day:
-                # This sale belongs to the current month's period
-                period_year = sale_date.year
-                period_month = sale_date.month
-            else:
-                # This sale belongs to the previous month's period
-                # Adjust for January (month 1)
-                if sale_date.month == 1:
-                    period_year = sale_date.year - 1
-                    period_month = 12
-                else:
-                    period_year = sale_date.year
-                    period_month = sale_date.month - 1
-                    
-            period_key = (period_year, period_month)
-            
-            if period_key not in accounting_periods:
-                accounting_periods[period_key] = []
-                
-            accounting_periods[period_key].append(sale)
         
-        # Process each accounting period
-        for (year, month), period_sales in accounting_periods.items():
-            # Calculate totals for this period
-            total_revenue = 0
-            total_cost = 0
-            total_profit = 0
-            sale_count = 0
-            
-            for sale in period_sales:
-                # Calculate profit for this sale
-                purchase_price = sale.product.purchase_price or 0
-                cost = purchase_price * sale.quantity
-                profit = sale.total_price - cost
-                
-                # Add to period totals
-                total_revenue += sale.total_price
-                total_cost += cost
-                total_profit += profit
-                sale_count += 1
-            
-            # Create monthly profit record for this period
-            monthly_profit = MonthlyProfit(
-                year=year,
-                month=month,
-                total_revenue=total_revenue,
-                total_cost=total_cost,
-                total_profit=total_profit,
-                sale_count=sale_count
-            )
-            db.session.add(monthly_profit)
+        for year in range(first_year, last_year + 1):
+            # Periods of this year run from start_day of January to the day
+            # before start_day of the following January
+            db.session.execute(text("DELETE FROM monthly_profit WHERE year = :year"), {'year': year})
+            db.session.execute(text("""
+                INSERT INTO monthly_profit
+                    (year, month, total_revenue, total_cost, total_profit, sale_count)
+                SELECT CAST(strftime('%Y', s.business_date, :shift) AS INTEGER) AS period_year,
+                       CAST(strftime('%m', s.business_date, :shift) AS INTEGER) AS period_month,
+                       SUM(s.total_price),
+                       SUM(COALESCE(s.unit_cost, 0) * s.quantity),
+                       SUM(s.total_price - COALESCE(s.unit_cost, 0) * s.quantity),
+                       COUNT(*)
+                FROM sale s
+                WHERE s.business_date >= :period_start AND s.business_date < :period_end
+                GROUP BY period_year, period_month
+            """), {
+                'shift': shift,
+                'period_start': datetime(year, 1, start_day).date().isoformat(),
+                'period_end': datetime(year + 1, 1, start_day).date().isoformat()
+            })
+            db.session.commit()
         
+        # Drop rows for periods that no longer have any sales
+        db.session.execute(text("DELETE FROM monthly_profit WHERE year < :first_year OR year > :last_year"),
+                           {'first_year': first_year, 'last_year': last_year})
         db.session.commit()
         logger.info(f"Successfully recalculated all monthly profits with start day {start_day}")
         return True
@@ -1402,25 +2442,8 @@ def view_monthly_profits():
         # Define possible start days (1-28)
         start_days = list(range(1, 29))
         
-        # First check if the table exists
-        try:
-            db.session.execute(db.text("SELECT 1 FROM monthly_profit LIMIT 1"))
-            table_exists = True
-        except Exception as e:
-            if 'no such table' in str(e).lower():
-                logger.warning("monthly_profit table does not exist, creating it now")
-                table_exists = False
-                # Create the table if it doesn't exist
-                with app.app_context():
-                    db.create_all()
-                # Try to recalculate profits
-                recalculate_monthly_profits(start_day=start_day)
-            else:
-                logger.error(f"Database error checking for monthly_profit table: {str(e)}")
-                raise
-        
-        # Get all monthly profit records ordered by year and month (most recent first)
-        monthly_profits = MonthlyProfit.query.order_by(MonthlyProfit.year.desc(), MonthlyProfit.month.desc()).all()
+        # Assemble the accounting periods for the selected start day from the daily rollup
+        monthly_profits = get_period_profits(start_day=start_day)
         
         # Calculate totals
         total_revenue = sum(mp.total_revenue for mp in monthly_profits)
@@ -1464,7 +2487,7 @@ def admin_recalculate_profits():
             flash(_('Access denied. Admin privileges required.'), 'danger')
             return redirect(url_for('index'))
         
-        # Get the start day from the form
+        # Get the start day from the form to return to the same view
         start_day = request.form.get('start_day', '1')
         try:
             start_day = int(start_day)
@@ -1473,9 +2496,12 @@ def admin_recalculate_profits():
         except (ValueError, TypeError):
             start_day = 1
         
-        logger.debug(f"Recalculating monthly profits with start_day={start_day}")
-        
-        if recalculate_monthly_profits(start_day=start_day):
+        # Every start day is assembled from the daily rollup when the page is
+        # viewed, so this only repairs the stored summaries from the raw sales.
+        # monthly_profit always holds calendar months, matching the per-sale
+        # updates, whichever start day is being viewed.
+        logger.debug("Rebuilding daily sales summary and monthly profits from sales data")
+        if rebuild_daily_sales_summary() and recalculate_monthly_profits():
             flash(_('Monthly profits have been recalculated successfully.'), 'success')
         else:
             flash(_('An error occurred while recalculating monthly profits.'), 'danger')
@@ -1492,12 +2518,26 @@ class CashoutRecord(db.Model):
     total_amount = db.Column(db.Float, nullable=False, default=0.0)
     transaction_count = db.Column(db.Integer, nullable=False, default=0)
     cashed_out_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    cashed_out_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    cashed_out_at = db.Column(db.DateTime, nullable=False, default=get_cat_time, index=True)
     notes = db.Column(db.Text, nullable=True)
 
     # Define the relationship to the User model
     admin = db.relationship('User', foreign_keys=[cashed_out_by], backref='cashouts')
 
+# Links sales recorded before sale.cashout_id existed to the first cashout
+# made after them
+CASHOUT_BACKFILL_SQL = """
+    UPDATE sale SET
+        is_cashed_out = 1,
+        cashout_id = (
+            SELECT id FROM cashout_record
+            WHERE cashed_out_at >= sale.date_sold
+            ORDER BY cashed_out_at
+            LIMIT 1
+        )
+    WHERE date_sold <= (SELECT MAX(cashed_out_at) FROM cashout_record)
+"""
+
 @app.route('/admin/cashout')
 @login_required
 def admin_cashout():
@@ -1507,50 +2547,48 @@ def admin_cashout():
             return redirect(url_for('index'))
         
         # Get today's date for display purposes
-        today = datetime.now().date()
+        today = get_cat_date()
         
-        # Get the most recent cashout (regardless of date)
-        most_recent_cashout = CashoutRecord.query.order_by(CashoutRecord.cashed_out_at.desc()).first()
+        # Register totals per cashier come from one grouped query; only the
+        # page of sales being displayed is loaded
+        uncashed = get_uncashed_sales()
+        cursor = request.args.get('cursor', '')
+        uncashed_sales, next_cursor = list_uncashed_sales(cursor=cursor)
         
         # Get all cashouts for today (for display purposes)
-        today_cashouts = CashoutRecord.query.filter_by(date=today).order_by(CashoutRecord.cashed_out_at.desc()).all()
-        
-        # Get sales that haven't been cashed out yet
-        if most_recent_cashout:
-            # Only get sales after the most recent cashout
-            uncashed_sales = Sale.query.filter(
-                Sale.date_sold > most_recent_cashout.cashed_out_at
-            ).order_by(Sale.date_sold.desc()).all()
-        else:
-            # No cashouts ever, get all sales
-            uncashed_sales = Sale.query.order_by(Sale.date_sold.desc()).all()
-        
-        # Calculate totals for uncashed sales
-        total_revenue = sum(sale.total_price for sale in uncashed_sales)
+        today_cashouts = CashoutRecord.query.options(db.joinedload(CashoutRecord.admin)).filter_by(
+            date=today
+        ).order_by(CashoutRecord.cashed_out_at.desc()).all()
         
-        # Group sales by cashier (only uncashed sales)
+        # Group this page of sales by cashier, with each cashier's full totals
         cashier_sales = {}
         for sale in uncashed_sales:
             if sale.cashier_id not in cashier_sales:
+                totals = uncashed['cashiers'].get(sale.cashier_id, {})
                 cashier_sales[sale.cashier_id] = {
                     'cashier': sale.cashier,
                     'sales': [],
-                    'total': 0
+                    'total': totals.get('total_revenue', 0),
+                    'transaction_count': totals.get('transaction_count', 0)
                 }
             cashier_sales[sale.cashier_id]['sales'].append(sale)
-            cashier_sales[sale.cashier_id]['total'] += sale.total_price
         
-        # Get all cashouts (for history)
-        all_cashouts = CashoutRecord.query.order_by(CashoutRecord.date.desc(), CashoutRecord.cashed_out_at.desc()).limit(30).all()
+        # The most recent cashouts; older ones are on the cashout history pages
+        all_cashouts, more_cashouts = paginate_cashouts(CashoutRecord.query)
         
         return render_template(
             'admin_cashout.html',
             today_sales=uncashed_sales,
-            total_revenue=total_revenue,
+            total_revenue=uncashed['total_revenue'],
+            transaction_count=uncashed['transaction_count'],
+            active_cashiers=len(uncashed['cashiers']),
             cashier_sales=cashier_sales,
+            cursor=cursor,
+            next_cursor=next_cursor,
             today=today,
             today_cashouts=today_cashouts,
-            all_cashouts=all_cashouts
+            all_cashouts=all_cashouts,
+            more_cashouts=more_cashouts is not None
         )
     except Exception as e:
         import traceback
@@ -1567,64 +2605,55 @@ def perform_cashout():
             flash(_('Access denied. Admin privileges required.'), 'danger')
             return redirect(url_for('index'))
         
-        today = datetime.now().date()
-        now = datetime.now()
-        
-        # Get the most recent cashout (regardless of date)
-        most_recent_cashout = CashoutRecord.query.order_by(CashoutRecord.cashed_out_at.desc()).first()
-        
-        # Get sales that haven't been cashed out yet
-        if most_recent_cashout:
-            # Only get sales after the most recent cashout
-            uncashed_sales = Sale.query.filter(
-                Sale.date_sold > most_recent_cashout.cashed_out_at
-            ).all()
-        else:
-            # No cashouts ever, get all sales
-            uncashed_sales = Sale.query.all()
-        
-        # Calculate totals for uncashed sales only
-        total_revenue = sum(sale.total_price for sale in uncashed_sales)
-        transaction_count = len(uncashed_sales)
+        today = get_cat_date()
         notes = request.form.get('notes', '')
         
-        # Don't allow cashout if there are no sales to cash out
-        if transaction_count == 0:
-            flash(_('No sales to cash out. Make some sales first.'), 'warning')
-            return redirect(url_for('admin_cashout'))
-        
         # Create a new cashout record using SQLAlchemy
         try:
-            # Create a new record with current timestamp
-            timestamp_now = datetime.now()
-            
-            # Create the cashout record using the model
+            # Create a new record with current timestamp, in the same CAT clock as date_sold
             new_cashout = CashoutRecord(
                 date=today,
-                total_amount=total_revenue,
-                transaction_count=transaction_count,
+                total_amount=0.0,
+                transaction_count=0,
                 cashed_out_by=current_user.id,
-                cashed_out_at=timestamp_now,
+                cashed_out_at=get_cat_time(),
                 notes=notes
             )
             
-            # Add and commit to the database
+            # Writing the record takes the database write lock, so no sale can
+            # be recorded between tagging the sales and committing
             db.session.add(new_cashout)
             db.session.flush()  # Get the ID of the new cashout record
             
-            # Mark all uncashed sales as cashed out
-            try:
-                for sale in uncashed_sales:
-                    sale.is_cashed_out = True
-                    sale.cashout_id = new_cashout.id
-            except Exception as column_e:
-                logger.warning(f"Could not update is_cashed_out field: {str(column_e)}")
-                
+            # Tag every uncashed sale in one statement, then total exactly the
+            # rows that were tagged
+            db.session.execute(text("""
+                UPDATE sale SET is_cashed_out = 1, cashout_id = :cashout_id
+                WHERE is_cashed_out = 0
+            """), {'cashout_id': new_cashout.id})
+            transaction_count, total_revenue = db.session.execute(text("""
+                SELECT COUNT(*), COALESCE(SUM(total_price), 0)
+                FROM sale
+                WHERE cashout_id = :cashout_id
+            """), {'cashout_id': new_cashout.id}).one()
+            
+            # Don't allow cashout if there are no sales to cash out
+            if transaction_count == 0:
+                db.session.rollback()
+                flash(_('No sales to cash out. Make some sales first.'), 'warning')
+                return redirect(url_for('admin_cashout'))
+            
+            new_cashout.total_amount = total_revenue
+            new_cashout.transaction_count = transaction_count
+            
+            # Every uncashed sale was just tagged, so no cashier holds cash anymore
+            db.session.execute(text("UPDATE cashier_balance SET uncashed_revenue = 0, uncashed_count = 0"))
             db.session.commit()
             
             flash(_('Cash out completed successfully. The register has been reset.'), 'success')
             return redirect(url_for('admin_cashout'))
         except Exception as inner_e:
+            db.session.rollback()
             import traceback
             error_traceback = traceback.format_exc()
             logger.error(f"Database error in perform_cashout: {str(inner_e)}\n{error_traceback}")
@@ -1652,7 +2681,23 @@ def undo_cashout(cashout_id):
         # Store information for the flash message
         cashout_date = cashout_record.date.strftime('%Y-%m-%d')
         
-        # Delete the cashout record
+        # Put the sales it covered back in the register and in their cashiers'
+        # balances, then delete the record
+        db.session.execute(text("""
+            INSERT INTO cashier_balance
+                (cashier_id, lifetime_revenue, uncashed_revenue, uncashed_count)
+            SELECT cashier_id, 0, SUM(total_price), COUNT(*)
+            FROM sale
+            WHERE cashout_id = :cashout_id
+            GROUP BY cashier_id
+            ON CONFLICT(cashier_id) DO UPDATE SET
+                uncashed_revenue = uncashed_revenue + excluded.uncashed_revenue,
+                uncashed_count = uncashed_count + excluded.uncashed_count
+        """), {'cashout_id': cashout_id})
+        db.session.execute(text("""
+            UPDATE sale SET is_cashed_out = 0, cashout_id = NULL
+            WHERE cashout_id = :cashout_id
+        """), {'cashout_id': cashout_id})
         db.session.delete(cashout_record)
         db.session.commit()
         
@@ -1665,6 +2710,130 @@ def undo_cashout(cashout_id):
         flash(_('An error occurred while undoing the cash out. Please try again.'), 'danger')
         return redirect(url_for('admin_cashout'))
 
+# Number of cashouts shown per page of the cashout history
+CASHOUT_PAGE_SIZE = 30
+
+def paginate_cashouts(query, cursor=None, page_size=CASHOUT_PAGE_SIZE):
+    """Return one page of cashouts, newest first, and the cursor for the next page.
+
+    Pages are keyed on (cashed_out_at, id) like the sales listings, so each
+    page starts where the previous one ended in the cashed_out_at index.
+    """
+    if cursor:
+        try:
+            cashed_out_at, cashout_id = cursor.split(',')
+            key = (datetime.fromisoformat(cashed_out_at), int(cashout_id))
+            query = query.filter(
+                CashoutRecord.cashed_out_at <= key[0],
+                db.tuple_(CashoutRecord.cashed_out_at, CashoutRecord.id) < key
+            )
+        except ValueError:
+            logger.warning(f"Ignoring invalid cashout cursor: {cursor}")
+
+    cashouts = query.options(db.joinedload(CashoutRecord.admin)).order_by(
+        CashoutRecord.cashed_out_at.desc(), CashoutRecord.id.desc()
+    ).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(cashouts) > page_size:
+        cashouts = cashouts[:page_size]
+        last = cashouts[-1]
+        next_cursor = f"{last.cashed_out_at.isoformat()},{last.id}"
+    return cashouts, next_cursor
+
+def get_cashout_breakdown(cashout_id):
+    """Total the sales of one cashout per cashier and per product category"""
+    by_cashier = db.session.query(
+        User.username,
+        db.func.count(Sale.id),
+        db.func.sum(Sale.total_price)
+    ).join(User, User.id == Sale.cashier_id).filter(
+        Sale.cashout_id == cashout_id
+    ).group_by(Sale.cashier_id, User.username).order_by(User.username).all()
+
+    by_category = db.session.query(
+        Sale.category,
+        db.func.count(Sale.id),
+        db.func.sum(Sale.quantity),
+        db.func.sum(Sale.total_price)
+    ).filter(
+        Sale.cashout_id == cashout_id
+    ).group_by(Sale.category).order_by(db.func.sum(Sale.total_price).desc()).all()
+
+    return {
+        'cashiers': [
+            {'username': username, 'transaction_count': count, 'total': total or 0}
+            for username, count, total in by_cashier
+        ],
+        'categories': [
+            {'category': category or 'Uncategorized', 'transaction_count': count,
+             'quantity': quantity or 0, 'total': total or 0}
+            for category, count, quantity, total in by_category
+        ]
+    }
+
+@app.route('/admin/cashout/history')
+@login_required
+def cashout_history():
+    try:
+        if current_user.role != 'admin':
+            flash(_('Access denied. Admin privileges required.'), 'danger')
+            return redirect(url_for('index'))
+        
+        cursor = request.args.get('cursor', '')
+        cashouts, next_cursor = paginate_cashouts(CashoutRecord.query, cursor)
+        
+        total_cashed_out = db.session.execute(text(
+            "SELECT COALESCE(SUM(total_amount), 0) FROM cashout_record"
+        )).scalar()
+        
+        return render_template(
+            'cashout_history.html',
+            cashouts=cashouts,
+            total_cashed_out=total_cashed_out,
+            cursor=cursor,
+            next_cursor=next_cursor
+        )
+    except Exception as e:
+        logger.error(f"Error in cashout_history: {str(e)}")
+        flash(_('An error occurred while loading the cashout history. Please try again.'), 'danger')
+        return redirect(url_for('admin_cashout'))
+
+@app.route('/admin/cashout/<int:cashout_id>')
+@login_required
+def cashout_details(cashout_id):
+    if current_user.role != 'admin':
+        flash(_('Access denied. Admin privileges required.'), 'danger')
+        return redirect(url_for('index'))
+    
+    cashout = CashoutRecord.query.options(db.joinedload(CashoutRecord.admin)).get_or_404(cashout_id)
+    
+    try:
+        breakdown = get_cashout_breakdown(cashout_id)
+        
+        # Only the page of sales being displayed is loaded
+        cursor = request.args.get('cursor', '')
+        sales, next_cursor = paginate_sales(
+            Sale.query.options(db.joinedload(Sale.product), db.joinedload(Sale.cashier)).filter(
+                Sale.cashout_id == cashout_id
+            ),
+            cursor
+        )
+        
+        return render_template(
+            'cashout_details.html',
+            cashout=cashout,
+            sales=sales,
+            cashier_totals=breakdown['cashiers'],
+            category_totals=breakdown['categories'],
+            cursor=cursor,
+            next_cursor=next_cursor
+        )
+    except Exception as e:
+        logger.error(f"Error in cashout_details: {str(e)}")
+        flash(_('An error occurred while loading the cashout details. Please try again.'), 'danger')
+        return redirect(url_for('cashout_history'))
+
 def initialize_database():
     """Initialize the database and create admin and cashier users if they don't exist."""
     try:
@@ -1738,16 +2907,14 @@ def ensure_database_structure():
                 logger.warning("Recreating product table with all required columns...")
                 
                 # Get existing data
-                conn = db.engine.connect()
                 existing_data = []
                 try:
                     # Try to get existing data, but don't fail if columns are missing
-                    result = conn.execute(text("SELECT id, name, description, category, purchase_price, price, stock, low_stock_threshold, date_added FROM product"))
-                    existing_data = [dict(row) for row in result]
+                    with db.engine.connect() as conn:
+                        result = conn.execute(text("SELECT id, name, description, category, purchase_price, price, stock, low_stock_threshold, date_added FROM product"))
+                        existing_data = [dict(row) for row in result.mappings()]
                 except Exception as e:
                     logger.error(f"Error fetching existing product data: {e}")
-                finally:
-                    conn.close()
                 
                 # Drop and recreate the table
                 Product.__table__.drop(db.engine)
@@ -1780,6 +2947,97 @@ def ensure_database_structure():
                     db.session.commit()
                     logger.info(f"Restored {len(existing_data)} products to the recreated table")
         
+        # Add columns introduced after the table was first created
+        added_columns = {
+            'sale': [
+                ('receipt_id', 'INTEGER REFERENCES receipt (id)'),
+                ('business_date', 'DATE'),
+                ('unit_price', 'FLOAT'),
+                ('unit_cost', 'FLOAT'),
+                ('category', 'VARCHAR(50)'),
+                ('is_cashed_out', 'BOOLEAN NOT NULL DEFAULT 0'),
+                ('cashout_id', 'INTEGER REFERENCES cashout_record (id)')
+            ],
+            'receipt': [
+                ('idempotency_key', 'VARCHAR(64)')
+            ],
+            'product': [
+                ('version', 'INTEGER NOT NULL DEFAULT 1')
+            ]
+        }
+        new_columns = set()
+        for table_name, table_columns in added_columns.items():
+            existing = [col['name'] for col in inspector.get_columns(table_name)]
+            for column_name, column_type in table_columns:
+                if column_name not in existing:
+                    logger.warning(f"Adding missing column {table_name}.{column_name}")
+                    with db.engine.begin() as conn:
+                        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+                    new_columns.add(f"{table_name}.{column_name}")
+        
+        # Cashouts used to cover every sale up to their timestamp. Tag those
+        # sales once, when the column is added; later sales are tagged by
+        # perform_cashout itself.
+        if 'sale.is_cashed_out' in new_columns:
+            with db.engine.begin() as conn:
+                result = conn.execute(text(CASHOUT_BACKFILL_SQL))
+                logger.info(f"Marked {result.rowcount} sales as cashed out")
+        
+        # Sales recorded before business_date existed take the day of date_sold,
+        # which is already stored in CAT
+        with db.engine.begin() as conn:
+            result = conn.execute(text("UPDATE sale SET business_date = date(date_sold) WHERE business_date IS NULL"))
+            if result.rowcount:
+                logger.info(f"Backfilled business_date for {result.rowcount} sales")
+            # Older sales take the product's current purchase price as their cost,
+            # which is what their profit has been computed from so far
+            result = conn.execute(text("""
+                UPDATE sale SET
+                    unit_price = total_price / quantity,
+                    unit_cost = COALESCE((SELECT purchase_price FROM product WHERE product.id = sale.product_id), 0)
+                WHERE unit_cost IS NULL AND quantity > 0
+            """))
+            if result.rowcount:
+                logger.info(f"Backfilled unit price and cost for {result.rowcount} sales")
+            # Older sales take the product's current category; the rollup is
+            # rebuilt below so it agrees with them
+            result = conn.execute(text("""
+                UPDATE sale SET
+                    category = COALESCE((SELECT category FROM product WHERE product.id = sale.product_id), 'Uncategorized')
+                WHERE category IS NULL
+            """))
+            if result.rowcount:
+                logger.info(f"Backfilled category for {result.rowcount} sales")
+            # Indexes replaced by the ones declared on the models
+            for index_name in ['ix_sale_cashier_date_sold', 'ix_sale_business_date', 'ix_sale_cashier_business_date']:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        
+        # Create indexes declared on the models that older tables are missing
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        
+        # Full-text search over the product catalog
+        ensure_product_search_index()
+        
+        # Backfill the daily sales rollup the first time it is created
+        if not DailySalesSummary.query.first() and Sale.query.first():
+            logger.info("Daily sales summary is empty, rebuilding it from sales data")
+            rebuild_daily_sales_summary()
+        elif 'sale.category' in new_columns:
+            logger.info("Sales now keep their category, rebuilding the daily sales summary")
+            rebuild_daily_sales_summary()
+        
+        # Start the stock ledger from a snapshot of the current stock
+        if not StockSnapshot.query.first() and Product.query.first():
+            logger.info("No stock snapshot yet, taking the first one")
+            take_stock_snapshot()
+        
+        # Likewise for the cashier balances
+        if not CashierBalance.query.first() and Sale.query.first():
+            logger.info("Cashier balances are empty, rebuilding them from sales data")
+            rebuild_cashier_balances()
+        
         return True
     except Exception as e:
         logger.error(f"Error ensuring database structure: {e}")
@@ -0,0 +1,207 @@
+"""
+Concurrent read/write benchmark for the SQLite connection settings
+
+Seeds a scratch database with a sales history, then runs cashier writers
+(recording sales through record_checkout) next to report readers (a grouped
+aggregate over every sale), each in its own process like the workers of a
+WSGI server. Every configuration in CONFIGURATIONS starts from a fresh copy of
+the same database and runs the same workload. The table at the end compares
+sale throughput and latency, "database is locked" errors and report
+throughput.
+
+Usage: python bench_sqlite.py [--seconds 10] [--writers 4] [--readers 2] [--sales 200000]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+# Connection settings compared by the benchmark; None stands for the
+# SQLITE_PRAGMAS the app ships with
+CONFIGURATIONS = [
+    ('driver defaults', {}),
+    ('WAL', {'journal_mode': 'WAL'}),
+    ('WAL, synchronous=NORMAL', {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}),
+    ('app settings', None),
+]
+
+# The kind of query behind the admin reports: every sale, grouped
+REPORT_SQL = """
+    SELECT p.category, s.cashier_id, COUNT(*), SUM(s.total_price), SUM(s.unit_cost * s.quantity)
+    FROM sale s
+    JOIN product p ON p.id = s.product_id
+    GROUP BY p.category, s.cashier_id
+"""
+
+PRODUCT_COUNT = 200
+
+def load_app(db_path, pragmas=None):
+    """Import the app against db_path, optionally replacing its connection settings"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    logging.disable(logging.CRITICAL)
+    import app as inventory
+    if pragmas is not None:
+        inventory.SQLITE_PRAGMAS.clear()
+        inventory.SQLITE_PRAGMAS.update(pragmas)
+    return inventory
+
+def seed_database(db_path, sale_count):
+    """Create the schema, a cashier, products and sale_count historical sales
+
+    Returns the cashier id and the connection settings the app ships with.
+    """
+    inventory = load_app(db_path)
+    app_pragmas = dict(inventory.SQLITE_PRAGMAS)
+    inventory.SQLITE_PRAGMAS.clear()
+    with inventory.app.app_context():
+        inventory.ensure_database_structure()
+        cashier = inventory.User(username='cashier', role='cashier')
+        cashier.set_password('cashier123')
+        inventory.db.session.add(cashier)
+        inventory.db.session.add_all([
+            inventory.Product(name=f'Product {i}', category=f'Category {i % 8}', purchase_price=400,
+                              price=500, stock=10 ** 9, low_stock_threshold=10)
+            for i in range(PRODUCT_COUNT)
+        ])
+        inventory.db.session.commit()
+        cashier_id = cashier.id
+
+    conn = sqlite3.connect(db_path)
+    sold_at = '2025-01-01 09:00:00.000000'
+    conn.executemany("""
+        INSERT INTO sale (product_id, quantity, total_price, cashier_id, date_sold, business_date,
+                          unit_price, unit_cost, is_cashed_out)
+        VALUES (?, 1, 500, ?, ?, '2025-01-01', 500, 400, 1)
+    """, ((random.randint(1, PRODUCT_COUNT), cashier_id, sold_at) for _i in range(sale_count)))
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    return cashier_id, app_pragmas
+
+def run_writer(db_path, pragmas, cashier_id, seconds, barrier, results):
+    """Record one-line sales as fast as possible for the given number of seconds"""
+    inventory = load_app(db_path, pragmas)
+    latencies = []
+    locked = 0
+    with inventory.app.test_request_context():
+        inventory.db.session.execute(inventory.text("SELECT 1"))
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            line = {'product_id': random.randint(1, PRODUCT_COUNT), 'quantity': 1, 'sale_type': 'package'}
+            started = time.perf_counter()
+            try:
+                inventory.record_checkout(cashier_id, [line])
+                inventory.db.session.commit()
+                latencies.append(time.perf_counter() - started)
+            except inventory.OperationalError:
+                inventory.db.session.rollback()
+                locked += 1
+    results.put(('writer', latencies, locked))
+
+def run_reader(db_path, pragmas, seconds, barrier, results):
+    """Run the report query back to back for the given number of seconds"""
+    inventory = load_app(db_path, pragmas)
+    latencies = []
+    locked = 0
+    with inventory.app.app_context():
+        inventory.db.session.execute(inventory.text("SELECT 1"))
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                inventory.db.session.execute(inventory.text(REPORT_SQL)).fetchall()
+                inventory.db.session.commit()
+                latencies.append(time.perf_counter() - started)
+            except inventory.OperationalError:
+                inventory.db.session.rollback()
+                locked += 1
+    results.put(('reader', latencies, locked))
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def benchmark(name, template_path, scratch_dir, pragmas, cashier_id, args):
+    """Run the workload against a fresh copy of the template database"""
+    db_path = os.path.join(scratch_dir, f'bench_{len(os.listdir(scratch_dir))}.db')
+    shutil.copy(template_path, db_path)
+
+    # The journal mode is stored in the file, so set it before any worker connects
+    journal_mode = (pragmas or {}).get('journal_mode', 'DELETE')
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.close()
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(args.writers + args.readers)
+    results = context.Queue()
+    workers = [
+        context.Process(target=run_writer, args=(db_path, pragmas, cashier_id, args.seconds, barrier, results))
+        for _i in range(args.writers)
+    ] + [
+        context.Process(target=run_reader, args=(db_path, pragmas, args.seconds, barrier, results))
+        for _i in range(args.readers)
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _worker in workers]
+    for worker in workers:
+        worker.join()
+
+    writes = [latency for role, latencies, _locked in collected if role == 'writer' for latency in latencies]
+    reports = [latency for role, latencies, _locked in collected if role == 'reader' for latency in latencies]
+    return {
+        'name': name,
+        'sales_per_second': len(writes) / args.seconds,
+        'write_p50': percentile(writes, 0.5) * 1000,
+        'write_p95': percentile(writes, 0.95) * 1000,
+        'write_max': max(writes, default=0) * 1000,
+        'locked': sum(locked for _role, _latencies, locked in collected),
+        'reports_per_second': len(reports) / args.seconds,
+        'report_p50': (statistics.median(reports) if reports else 0) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10, help='How long each configuration runs')
+    parser.add_argument('--writers', type=int, default=4, help='Processes recording sales')
+    parser.add_argument('--readers', type=int, default=2, help='Processes running reports')
+    parser.add_argument('--sales', type=int, default=200000, help='Sales in the seeded history')
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='bench_sqlite_')
+    try:
+        template_path = os.path.join(scratch_dir, 'template.db')
+        print(f"Seeding {args.sales} sales...")
+        cashier_id, app_pragmas = seed_database(template_path, args.sales)
+
+        rows = []
+        for name, pragmas in CONFIGURATIONS:
+            print(f"Running '{name}' for {args.seconds:g}s with {args.writers} writers and {args.readers} readers...")
+            rows.append(benchmark(name, template_path, scratch_dir, app_pragmas if pragmas is None else pragmas,
+                                  cashier_id, args))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print()
+    print(f"{'Configuration':<26} {'Sales/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'Locked':>7} {'Reports/s':>10} {'p50 ms':>8}")
+    for row in rows:
+        print(f"{row['name']:<26} {row['sales_per_second']:>8.1f} {row['write_p50']:>8.1f} {row['write_p95']:>8.1f} "
+              f"{row['write_max']:>8.1f} {row['locked']:>7} {row['reports_per_second']:>10.1f} {row['report_p50']:>8.1f}")
+    print(f"\nApp settings: {app_pragmas}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,178 @@
+"""
+Query plan regression check for the hot routes
+
+Builds a scratch database from the models, requests each hot route through the
+Flask test client while recording every SELECT the route issues, then runs
+EXPLAIN QUERY PLAN on each statement. The check fails when a statement reads a
+large table with a full scan instead of an index.
+
+Usage: python check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+import logging
+
+# Point the app at a scratch database before it is imported
+scratch_dir = tempfile.mkdtemp(prefix='query_plans_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch_dir, 'inventory.db')}"
+
+from flask import request_finished
+from flask_login import current_user
+from sqlalchemy import event
+from app import app, db, User, Product, CashoutRecord, ensure_database_structure, record_checkout
+
+logging.disable(logging.CRITICAL)
+
+# Tables that grow with the business; a plain SCAN of these is a regression
+CHECKED_TABLES = {'product', 'sale', 'receipt', 'daily_sales_summary', 'monthly_profit', 'cashout_record', 'cashier_balance'}
+
+# Scans that are full by design, keyed by table, recognised by a fragment of
+# the statement. Any other scan of a checked table is reported.
+EXPECTED_SCANS = {
+    'product': [
+        'GROUP BY category',                  # dashboard histogram, one pass over a covering index
+        'ORDER BY product.name',              # full catalog listing on the products page
+        'SELECT DISTINCT product.category',   # category filter dropdowns
+    ],
+    'daily_sales_summary': [
+        'GROUP BY year, month',               # monthly profits page lists every month on record
+    ],
+    'cashout_record': [
+        'SUM(total_amount), 0) FROM cashout_record',  # all-time total on the cashout history page
+    ],
+}
+
+HOT_ROUTES = {
+    'admin': [
+        '/admin/dashboard',
+        '/admin/products',
+        '/admin/products?search=rice',
+        '/admin/sales',
+        '/admin/sales?start_date=2025-01-01&end_date=2025-12-31&category=Grains',
+        '/admin/monthly-profits',
+        '/admin/cashout',
+        '/admin/cashout/history',
+        '/admin/cashout/1',
+        # Cashiers are sent back to their dashboard; only admins get this page
+        '/cashier/sales',
+        '/cashier/sales?start_date=2025-01-01&end_date=2025-12-31&category=Grains',
+    ],
+    'cashier': [
+        '/cashier/dashboard',
+        '/cashier/dashboard?search=rice',
+        '/api/products',
+        '/api/products/search?q=ri',
+        '/cashier/sales-status',
+    ],
+}
+
+def seed_database():
+    """Create the schema and a little data so every route runs its queries"""
+    ensure_database_structure()
+    admin = User(username='admin', role='admin')
+    admin.set_password('admin123')
+    cashier = User(username='cashier', role='cashier')
+    cashier.set_password('cashier123')
+    db.session.add_all([admin, cashier])
+    rice = Product(name='Rice Nini', category='Grains', purchase_price=800, price=1000, stock=50)
+    beans = Product(name='Beans ntoya', category='Grains', purchase_price=500, price=700, stock=5)
+    db.session.add_all([rice, beans])
+    db.session.commit()
+
+    record_checkout(cashier.id, [
+        {'product_id': rice.id, 'quantity': 2, 'sale_type': 'package'},
+        {'product_id': beans.id, 'quantity': 1, 'sale_type': 'package'}
+    ])
+    db.session.add(CashoutRecord(date=db.func.current_date(), total_amount=0, cashed_out_by=admin.id))
+    db.session.commit()
+    return {'admin': admin.id, 'cashier': cashier.id}
+
+def capture_route_queries(engine, user_ids):
+    """Request every hot route and return the SELECT statements each one issued.
+
+    Must run outside an app context: each request then gets its own, so
+    Flask-Login loads the user of that request's session instead of reusing
+    the one cached in g by an earlier request. Raises AssertionError when a
+    route does not answer 200 to the role it is listed under.
+    """
+    captured = []
+    current_route = [None]
+    served_roles = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((current_route[0], statement, parameters))
+
+    def record_role(sender, response, **extra):
+        served_roles.append(current_user.role if current_user.is_authenticated else None)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    request_finished.connect(record_role, app)
+    try:
+        for role, routes in HOT_ROUTES.items():
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['_user_id'] = str(user_ids[role])
+            for route in routes:
+                current_route[0] = route
+                del served_roles[:]
+                response = client.get(route)
+                # Read the body so streamed templates run their queries too
+                response.get_data()
+                response.close()
+                assert response.status_code == 200, f"{route} returned {response.status_code} to the {role}"
+                assert served_roles == [role], f"{route} was served to {served_roles} instead of the {role}"
+    finally:
+        request_finished.disconnect(record_role, app)
+        event.remove(engine, 'before_cursor_execute', record_statement)
+    return captured
+
+def find_full_scans(statement, parameters):
+    """Return the plan lines that scan a large table without an index"""
+    with db.engine.connect() as conn:
+        plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        match = re.match(r'SCAN (\w+)', detail)
+        if not match or 'INDEX' in detail:
+            continue
+        table = match.group(1)
+        if table in CHECKED_TABLES and not any(marker in statement for marker in EXPECTED_SCANS.get(table, [])):
+            problems.append(detail)
+    return problems
+
+def main():
+    with app.app_context():
+        user_ids = seed_database()
+        engine = db.engine
+
+    captured = capture_route_queries(engine, user_ids)
+
+    with app.app_context():
+        checked = set()
+        failures = []
+        for route, statement, parameters in captured:
+            if statement in checked:
+                continue
+            checked.add(statement)
+            for detail in find_full_scans(statement, parameters):
+                failures.append((route, detail, statement))
+
+        print(f"Checked {len(checked)} distinct queries from {sum(len(r) for r in HOT_ROUTES.values())} routes")
+        if failures:
+            print(f"\n{len(failures)} full table scans found:")
+            for route, detail, statement in failures:
+                print(f"\n- {route}: {detail}")
+                print('  ' + ' '.join(statement.split()))
+            return False
+
+        print("No hot route falls back to a full table scan")
+        return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
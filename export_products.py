@@ -11,6 +11,7 @@ def export_products_to_json():
         print(f"Database file {db_path} not found")
         return False
     
+    conn = None
     try:
         # Connect to the database
         conn = sqlite3.connect(db_path)
@@ -30,86 +31,75 @@ def export_products_to_json():
         # Build a query that selects all available columns
         columns_str = ', '.join(columns)
         
-        # Get all products
+        # Stream the products straight from the cursor into the three output
+        # files instead of loading the whole table into memory first
         cursor.execute(f"SELECT {columns_str} FROM product")
-        rows = cursor.fetchall()
-        
-        if not rows:
-            print("No products found in the database")
-            return False
-        
-        # Convert rows to a list of dictionaries
-        products = []
-        for row in cursor.fetchall():
-            product = {}
-            for col in columns:
-                product[col] = row[col]
-            products.append(product)
         
         # Create a timestamp for the filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"products_export_{timestamp}.json"
-        
-        # Write the products to a JSON file
-        with open(filename, 'w') as f:
-            json.dump(products, f, indent=4)
-        
-        print(f"Exported {len(products)} products to {filename}")
-        
-        # Also create an SQL script that can be used to insert the products
         sql_filename = f"products_import_{timestamp}.sql"
-        with open(sql_filename, 'w') as f:
-            f.write("-- SQL script to import products\n")
-            f.write("-- Generated on " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
-            
-            for product in products:
-                # Create column names and values strings
-                col_names = ', '.join(product.keys())
-                placeholders = ', '.join(['?' for _ in product.keys()])
-                values = ', '.join([repr(str(val)) if isinstance(val, str) else str(val) if val is not None else 'NULL' for val in product.values()])
-                
-                # Write the INSERT statement
-                f.write(f"INSERT INTO product ({col_names}) VALUES ({values});\n")
-            
-            f.write("\n-- End of script\n")
-        
-        print(f"Created SQL import script at {sql_filename}")
-        
-        # Create a Python script that can be used to import the products
         py_filename = f"import_products_{timestamp}.py"
-        with open(py_filename, 'w') as f:
-            f.write("# Python script to import products\n")
-            f.write("# Generated on " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
-            f.write("import sqlite3\n")
-            f.write("import json\n\n")
+        
+        count = 0
+        with open(filename, 'w') as json_file, open(sql_filename, 'w') as sql_file, open(py_filename, 'w') as py_file:
+            # SQL script to insert the products
+            sql_file.write("-- SQL script to import products\n")
+            sql_file.write("-- Generated on " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
             
-            f.write("def import_products():\n")
-            f.write("    try:\n")
-            f.write("        # Connect to the database\n")
-            f.write("        conn = sqlite3.connect('inventory.db')\n")
-            f.write("        cursor = conn.cursor()\n\n")
+            # Python script to insert the products
+            py_file.write("# Python script to import products\n")
+            py_file.write("# Generated on " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
+            py_file.write("import sqlite3\n")
+            py_file.write("import json\n\n")
+            py_file.write("def import_products():\n")
+            py_file.write("    try:\n")
+            py_file.write("        # Connect to the database\n")
+            py_file.write("        conn = sqlite3.connect('inventory.db')\n")
+            py_file.write("        cursor = conn.cursor()\n\n")
+            py_file.write("        # Insert each product\n")
             
-            f.write("        # Insert each product\n")
-            for product in products:
+            # The JSON array is written one element at a time
+            json_file.write("[")
+            for row in cursor:
+                product = {col: row[col] for col in columns}
+                
+                json_file.write(",\n    " if count else "\n    ")
+                json_file.write(json.dumps(product, indent=4).replace("\n", "\n    "))
+                
                 # Create column names and values strings
                 col_names = ', '.join(product.keys())
                 placeholders = ', '.join(['?' for _ in product.keys()])
-                values = [str(val) if val is not None else None for val in product.values()]
-                values_str = ', '.join([repr(val) for val in values])
+                values = ', '.join([repr(str(val)) if isinstance(val, str) else str(val) if val is not None else 'NULL' for val in product.values()])
                 
                 # Write the INSERT statement
-                f.write(f"        cursor.execute(\"INSERT INTO product ({col_names}) VALUES ({placeholders})\", {values_str})\n")
+                sql_file.write(f"INSERT INTO product ({col_names}) VALUES ({values});\n")
+                
+                py_values = [str(val) if val is not None else None for val in product.values()]
+                values_str = ', '.join([repr(val) for val in py_values])
+                py_file.write(f"        cursor.execute(\"INSERT INTO product ({col_names}) VALUES ({placeholders})\", ({values_str},))\n")
+                count += 1
+            json_file.write("\n]\n" if count else "]\n")
             
-            f.write("\n        # Commit the changes and close the connection\n")
-            f.write("        conn.commit()\n")
-            f.write("        conn.close()\n")
-            f.write("        print(\"Products imported successfully\")\n")
-            f.write("    except Exception as e:\n")
-            f.write("        print(f\"Error importing products: {e}\")\n\n")
+            sql_file.write("\n-- End of script\n")
             
-            f.write("if __name__ == \"__main__\":\n")
-            f.write("    import_products()\n")
+            py_file.write("\n        # Commit the changes and close the connection\n")
+            py_file.write("        conn.commit()\n")
+            py_file.write("        conn.close()\n")
+            py_file.write("        print(\"Products imported successfully\")\n")
+            py_file.write("    except Exception as e:\n")
+            py_file.write("        print(f\"Error importing products: {e}\")\n\n")
+            py_file.write("if __name__ == \"__main__\":\n")
+            py_file.write("    import_products()\n")
+        
+        if not count:
+            print("No products found in the database")
+            for path in (filename, sql_filename, py_filename):
+                os.remove(path)
+            return False
         
+        print(f"Exported {count} products to {filename}")
+        print(f"Created SQL import script at {sql_filename}")
         print(f"Created Python import script at {py_filename}")
         
         return True
@@ -0,0 +1,83 @@
+"""
+Database migration script to add the sale.business_date column, backfill it
+from date_sold and index it for day and period filters
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Add and backfill sale.business_date and create its indexes"""
+    logger.info("Running migration to add the sale business date...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check if the column already exists
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        if 'business_date' not in columns:
+            logger.info("Adding 'business_date' column to sale table")
+            cursor.execute("ALTER TABLE sale ADD COLUMN business_date DATE")
+        else:
+            logger.info("'business_date' column already exists")
+
+        # date_sold is stored in CAT, so its calendar day is the business date
+        logger.info("Backfilling 'business_date' from date_sold")
+        cursor.execute("UPDATE sale SET business_date = date(date_sold) WHERE business_date IS NULL")
+        logger.info(f"Backfilled {cursor.rowcount} sales")
+
+        logger.info("Creating business date indexes")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_sale_business_date ON sale (business_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_sale_cashier_business_date ON sale (cashier_id, business_date)")
+        cursor.execute("DROP INDEX IF EXISTS ix_sale_cashier_date_sold")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,91 @@
+"""
+Database migration script to add the cashier_balance table and fill it from
+the existing sales history
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the cashier_balance table and fill it from the sale table"""
+    logger.info("Running migration to add the cashier balance table...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        logger.info("Creating 'cashier_balance' table if it does not exist")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cashier_balance (
+                cashier_id INTEGER NOT NULL,
+                lifetime_revenue FLOAT NOT NULL,
+                uncashed_revenue FLOAT NOT NULL,
+                uncashed_count INTEGER NOT NULL,
+                PRIMARY KEY (cashier_id),
+                FOREIGN KEY(cashier_id) REFERENCES user (id)
+            )
+        """)
+
+        # Rebuild the balances from scratch so the migration can be re-run
+        # safely. Needs sale.is_cashed_out from add_sale_cashout.py.
+        logger.info("Backfilling 'cashier_balance' from the sale table")
+        cursor.execute("DELETE FROM cashier_balance")
+        cursor.execute("""
+            INSERT INTO cashier_balance
+                (cashier_id, lifetime_revenue, uncashed_revenue, uncashed_count)
+            SELECT cashier_id,
+                   SUM(total_price),
+                   SUM(CASE WHEN is_cashed_out = 0 THEN total_price ELSE 0 END),
+                   SUM(CASE WHEN is_cashed_out = 0 THEN 1 ELSE 0 END)
+            FROM sale
+            GROUP BY cashier_id
+        """)
+        logger.info(f"Inserted {cursor.rowcount} cashier balance rows")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
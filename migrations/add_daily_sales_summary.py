@@ -0,0 +1,99 @@
+"""
+Database migration script to add the daily_sales_summary rollup table and
+backfill it from the existing sales history
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the daily_sales_summary table and fill it from the sale table"""
+    logger.info("Running migration to add the daily sales summary table...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        logger.info("Creating 'daily_sales_summary' table if it does not exist")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_sales_summary (
+                id INTEGER NOT NULL,
+                business_date DATE NOT NULL,
+                category VARCHAR(50) NOT NULL,
+                cashier_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                revenue FLOAT NOT NULL,
+                cost FLOAT NOT NULL,
+                transaction_count INTEGER NOT NULL,
+                PRIMARY KEY (id),
+                CONSTRAINT unique_daily_sales_summary UNIQUE (business_date, category, cashier_id),
+                FOREIGN KEY(cashier_id) REFERENCES user (id)
+            )
+        """)
+
+        # Rebuild the rollup from scratch so the migration can be re-run safely
+        logger.info("Backfilling 'daily_sales_summary' from the sale table")
+        cursor.execute("DELETE FROM daily_sales_summary")
+        cursor.execute("""
+            INSERT INTO daily_sales_summary
+                (business_date, category, cashier_id, quantity, revenue, cost, transaction_count)
+            SELECT date(s.date_sold),
+                   COALESCE(p.category, 'Uncategorized'),
+                   s.cashier_id,
+                   SUM(s.quantity),
+                   SUM(s.total_price),
+                   SUM(COALESCE(p.purchase_price, 0) * s.quantity),
+                   COUNT(*)
+            FROM sale s
+            JOIN product p ON p.id = s.product_id
+            GROUP BY date(s.date_sold), COALESCE(p.category, 'Uncategorized'), s.cashier_id
+        """)
+        logger.info(f"Inserted {cursor.rowcount} daily summary rows")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
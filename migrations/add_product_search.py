@@ -0,0 +1,99 @@
+"""
+Database migration script to add the product_fts full-text search index,
+the triggers that keep it in sync with the product table, and to index the
+existing products
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the product_fts table and triggers and index existing products"""
+    logger.info("Running migration to add the product full-text search index...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        logger.info("Creating 'product_fts' table if it does not exist")
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+                name, description, category,
+                content='product', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+
+        logger.info("Creating triggers to keep 'product_fts' in sync")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+                INSERT INTO product_fts(rowid, name, description, category)
+                VALUES (new.id, new.name, new.description, new.category);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+                INSERT INTO product_fts(product_fts, rowid, name, description, category)
+                VALUES ('delete', old.id, old.name, old.description, old.category);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF name, description, category ON product BEGIN
+                INSERT INTO product_fts(product_fts, rowid, name, description, category)
+                VALUES ('delete', old.id, old.name, old.description, old.category);
+                INSERT INTO product_fts(rowid, name, description, category)
+                VALUES (new.id, new.name, new.description, new.category);
+            END
+        """)
+
+        # Rebuild the index from the product table so the migration can be re-run safely
+        logger.info("Indexing existing products")
+        cursor.execute("INSERT INTO product_fts(product_fts) VALUES ('rebuild')")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
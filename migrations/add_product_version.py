@@ -0,0 +1,73 @@
+"""
+Database migration script to add the version column used to detect
+conflicting product edits
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Add product.version, starting every product at version 1"""
+    logger.info("Running migration to add the product version column...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check which columns already exist
+        cursor.execute("PRAGMA table_info(product)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        if 'version' not in columns:
+            logger.info("Adding 'version' column to product table")
+            cursor.execute("ALTER TABLE product ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        else:
+            logger.info("'version' column already exists")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,92 @@
+"""
+Database migration script to add the indexes behind the hot dashboard,
+sales listing and cashout queries
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+# Index name, table, indexed columns and optional partial-index condition
+INDEXES = [
+    ('ix_sale_date_sold_total_price', 'sale', ['date_sold', 'total_price'], None),
+    ('ix_sale_cashier_date_sold', 'sale', ['cashier_id', 'date_sold'], None),
+    ('ix_sale_product_id', 'sale', ['product_id'], None),
+    ('ix_sale_receipt_id', 'sale', ['receipt_id'], None),
+    ('ix_product_category_stock', 'product', ['category', 'stock', 'low_stock_threshold'], None),
+    ('ix_product_low_stock', 'product', ['stock'], 'stock <= low_stock_threshold'),
+    ('ix_cashout_record_cashed_out_at', 'cashout_record', ['cashed_out_at'], None),
+]
+
+def run_migration():
+    """Create the query indexes that do not exist yet"""
+    logger.info("Running migration to add query indexes...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        for index_name, table, columns, where in INDEXES:
+            # Skip indexes on columns an older schema does not have yet
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = [col[1] for col in cursor.fetchall()]
+            missing = [col for col in columns if col not in existing]
+            if missing:
+                logger.warning(f"Skipping {index_name}: {table} has no column(s) {', '.join(missing)}")
+                continue
+
+            logger.info(f"Creating index '{index_name}' on {table} if it does not exist")
+            statement = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(columns)})"
+            if where:
+                statement += f" WHERE {where}"
+            cursor.execute(statement)
+
+        # Refresh the planner statistics for the new indexes
+        cursor.execute("ANALYZE")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
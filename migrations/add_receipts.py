@@ -0,0 +1,95 @@
+"""
+Database migration script to add the receipt table, link sales to the
+receipt they were checked out on and index the API idempotency keys
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the receipt table and add receipt_id to the Sale table"""
+    logger.info("Running migration to add receipts...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        logger.info("Creating 'receipt' table if it does not exist")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS receipt (
+                id INTEGER NOT NULL,
+                cashier_id INTEGER NOT NULL,
+                created_at DATETIME,
+                total_amount FLOAT NOT NULL,
+                item_count INTEGER NOT NULL,
+                idempotency_key VARCHAR(64),
+                PRIMARY KEY (id),
+                FOREIGN KEY(cashier_id) REFERENCES user (id)
+            )
+        """)
+
+        cursor.execute("PRAGMA table_info(receipt)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'idempotency_key' not in columns:
+            logger.info("Adding 'idempotency_key' column to Receipt table")
+            cursor.execute("ALTER TABLE receipt ADD COLUMN idempotency_key VARCHAR(64)")
+
+        logger.info("Creating unique index on receipt.idempotency_key")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_receipt_idempotency_key ON receipt (idempotency_key)")
+
+        # Check if the column already exists
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'receipt_id' not in columns:
+            logger.info("Adding 'receipt_id' column to Sale table")
+            cursor.execute("ALTER TABLE sale ADD COLUMN receipt_id INTEGER REFERENCES receipt (id)")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
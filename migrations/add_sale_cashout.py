@@ -0,0 +1,103 @@
+"""
+Database migration script to add the is_cashed_out and cashout_id columns to
+the sale table, link existing sales to the cashout that covered them and index
+the uncashed sales
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Add sale.is_cashed_out and sale.cashout_id and tag already cashed sales"""
+    logger.info("Running migration to add sale cashout tracking...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check which columns already exist
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        for column, column_type in [
+            ('is_cashed_out', 'BOOLEAN NOT NULL DEFAULT 0'),
+            ('cashout_id', 'INTEGER REFERENCES cashout_record (id)')
+        ]:
+            if column not in columns:
+                logger.info(f"Adding '{column}' column to sale table")
+                cursor.execute(f"ALTER TABLE sale ADD COLUMN {column} {column_type}")
+            else:
+                logger.info(f"'{column}' column already exists")
+
+        # Each cashout covered every sale recorded before it, so link those
+        # sales to the first cashout made after them. This only runs when the
+        # column is first added: later sales are tagged by the cashout itself.
+        if 'is_cashed_out' not in columns:
+            logger.info("Linking existing sales to their cashouts")
+            cursor.execute("""
+                UPDATE sale SET
+                    is_cashed_out = 1,
+                    cashout_id = (
+                        SELECT id FROM cashout_record
+                        WHERE cashed_out_at >= sale.date_sold
+                        ORDER BY cashed_out_at
+                        LIMIT 1
+                    )
+                WHERE date_sold <= (SELECT MAX(cashed_out_at) FROM cashout_record)
+            """)
+            logger.info(f"Marked {cursor.rowcount} sales as cashed out")
+
+        logger.info("Creating indexes for uncashed and cashed out sales")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_sale_uncashed
+            ON sale (cashier_id, total_price) WHERE is_cashed_out = 0
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_sale_cashout_id_total_price ON sale (cashout_id, total_price)")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,104 @@
+"""
+Database migration script to add the category snapshot column to the sale
+table, backfill it for existing sales and rebuild the daily sales summary
+from it
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Add sale.category, fill it for existing sales and rebuild the rollup"""
+    logger.info("Running migration to add the sale category...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check if the column already exists
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        if 'category' not in columns:
+            logger.info("Adding 'category' column to sale table")
+            cursor.execute("ALTER TABLE sale ADD COLUMN category VARCHAR(50)")
+        else:
+            logger.info("'category' column already exists")
+
+        # The category a sale was made under is not known for older sales,
+        # so they take the product's current one
+        logger.info("Backfilling category for existing sales")
+        cursor.execute("""
+            UPDATE sale SET
+                category = COALESCE((SELECT category FROM product WHERE product.id = sale.product_id), 'Uncategorized')
+            WHERE category IS NULL
+        """)
+        logger.info(f"Backfilled {cursor.rowcount} sales")
+
+        # Rebuild the rollup so it is keyed on the stored categories
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='daily_sales_summary'")
+        if cursor.fetchone():
+            logger.info("Rebuilding 'daily_sales_summary' from the sale table")
+            cursor.execute("DELETE FROM daily_sales_summary")
+            cursor.execute("""
+                INSERT INTO daily_sales_summary
+                    (business_date, category, cashier_id, quantity, revenue, cost, transaction_count)
+                SELECT business_date,
+                       COALESCE(category, 'Uncategorized'),
+                       cashier_id,
+                       SUM(quantity),
+                       SUM(total_price),
+                       SUM(COALESCE(unit_cost, 0) * quantity),
+                       COUNT(*)
+                FROM sale
+                GROUP BY business_date, COALESCE(category, 'Uncategorized'), cashier_id
+            """)
+            logger.info(f"Inserted {cursor.rowcount} daily summary rows")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,85 @@
+"""
+Database migration script to add the unit_price and unit_cost snapshot
+columns to the sale table and backfill them for existing sales
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Add sale.unit_price and sale.unit_cost and fill them for existing sales"""
+    logger.info("Running migration to add sale unit price and cost...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Check which columns already exist
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        for column in ['unit_price', 'unit_cost']:
+            if column not in columns:
+                logger.info(f"Adding '{column}' column to sale table")
+                cursor.execute(f"ALTER TABLE sale ADD COLUMN {column} FLOAT")
+            else:
+                logger.info(f"'{column}' column already exists")
+
+        # Existing profit figures were computed from the product's current
+        # purchase price, so that is the cost recorded for older sales
+        logger.info("Backfilling unit price and cost for existing sales")
+        cursor.execute("""
+            UPDATE sale SET
+                unit_price = total_price / quantity,
+                unit_cost = COALESCE((SELECT purchase_price FROM product WHERE product.id = sale.product_id), 0)
+            WHERE unit_cost IS NULL AND quantity > 0
+        """)
+        logger.info(f"Backfilled {cursor.rowcount} sales")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,114 @@
+"""
+Database migration script to add the stock_movement ledger and the
+stock_snapshot table, starting the ledger from a snapshot of the current stock
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the stock ledger tables and take the first stock snapshot"""
+    logger.info("Running migration to add the stock movement ledger...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        logger.info("Creating 'stock_movement' table if it does not exist")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_movement (
+                id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity_change INTEGER NOT NULL,
+                individual_change INTEGER NOT NULL,
+                reason VARCHAR(20) NOT NULL,
+                sale_id INTEGER,
+                user_id INTEGER,
+                created_at DATETIME NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(product_id) REFERENCES product (id),
+                FOREIGN KEY(user_id) REFERENCES user (id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_stock_movement_product_id ON stock_movement (product_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_stock_movement_created_at ON stock_movement (created_at)")
+
+        logger.info("Creating 'stock_snapshot' table if it does not exist")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_snapshot (
+                id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                taken_at DATETIME NOT NULL,
+                stock INTEGER NOT NULL,
+                individual_stock INTEGER NOT NULL,
+                last_movement_id INTEGER NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(product_id) REFERENCES product (id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_stock_snapshot_product_taken_at
+            ON stock_snapshot (product_id, taken_at)
+        """)
+
+        # Stock has no history before the ledger, so it starts from today's levels
+        cursor.execute("SELECT COUNT(*) FROM stock_snapshot")
+        if cursor.fetchone()[0] == 0:
+            logger.info("Taking the first stock snapshot")
+            cursor.execute("""
+                INSERT INTO stock_snapshot (product_id, taken_at, stock, individual_stock, last_movement_id)
+                SELECT id, datetime('now', '+2 hours'), COALESCE(stock, 0), COALESCE(individual_stock, 0),
+                       (SELECT COALESCE(MAX(id), 0) FROM stock_movement)
+                FROM product
+            """)
+            logger.info(f"Snapshotted {cursor.rowcount} products")
+        else:
+            logger.info("Stock snapshots already exist")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
@@ -0,0 +1,80 @@
+"""
+Database migration script to replace the sale business date indexes with
+ones that also cover date_sold, so the paginated sales listings walk the
+index in order
+"""
+import sqlite3
+import os
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("migrations.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("migrations")
+
+# Path to the database file - adjust as needed for your deployment environment
+DB_PATH = 'instance/inventory.db'
+PROD_DB_PATH = '/home/renoir0/SmartInventory/instance/inventory.db'
+
+def run_migration():
+    """Create the sales listing indexes and drop the ones they replace"""
+    logger.info("Running migration to update the sales listing indexes...")
+
+    # Determine the correct database path
+    db_path = PROD_DB_PATH if os.path.exists(PROD_DB_PATH) else DB_PATH
+
+    if not os.path.exists(db_path):
+        logger.error(f"Database file not found at {db_path}")
+        return False
+
+    try:
+        # Connect to the database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # The business date indexes need the column added by add_business_date.py
+        cursor.execute("PRAGMA table_info(sale)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'business_date' not in columns:
+            logger.error("sale.business_date is missing. Run add_business_date.py first.")
+            conn.close()
+            return False
+
+        logger.info("Creating sales listing indexes")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_sale_business_date_sold ON sale (business_date, date_sold)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_sale_cashier_business_date_sold ON sale (cashier_id, business_date, date_sold)")
+
+        logger.info("Dropping the indexes they replace")
+        cursor.execute("DROP INDEX IF EXISTS ix_sale_business_date")
+        cursor.execute("DROP INDEX IF EXISTS ix_sale_cashier_business_date")
+
+        # Commit the changes
+        conn.commit()
+        logger.info("Migration completed successfully")
+
+        # Close the connection
+        conn.close()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    if success:
+        print("Migration completed successfully")
+        sys.exit(0)
+    else:
+        print("Migration failed. Check the logs for details.")
+        sys.exit(1)
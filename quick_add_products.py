@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 import os
 import sys
 from datetime import datetime
+import pytz
 import csv
 import io
 
@@ -59,6 +60,21 @@ category_translations = {
     'Cleaning': 'Isukura'
 }
 
+# Stock movement ledger (same as in app.py); every stock change is logged here
+def get_cat_time():
+    return datetime.now(pytz.timezone('Africa/Kigali'))
+
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movement'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity_change = db.Column(db.Integer, nullable=False, default=0)
+    individual_change = db.Column(db.Integer, nullable=False, default=0)
+    reason = db.Column(db.String(20), nullable=False)
+    sale_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=get_cat_time)
+
 def get_category_translation(category, language='en'):
     """Get category translation based on language"""
     if language == 'rw' and category in category_translations:
@@ -86,6 +102,9 @@ def add_or_update_product(name, stock, price=None, purchase_price=None, category
         # Update existing product
         old_stock = existing_product.stock
         existing_product.stock = stock
+        if stock != (old_stock or 0):
+            db.session.add(StockMovement(product_id=existing_product.id,
+                                         quantity_change=stock - (old_stock or 0), reason='import'))
         
         if price is not None:
             existing_product.price = price
@@ -115,6 +134,8 @@ def add_or_update_product(name, stock, price=None, purchase_price=None, category
         )
         
         db.session.add(new_product)
+        db.session.flush()
+        db.session.add(StockMovement(product_id=new_product.id, quantity_change=stock, reason='import'))
         db.session.commit()
         return new_product, f"Added: {name} (Stock: {stock})", True
 
@@ -335,6 +356,9 @@ def update_stock(product_id):
     try:
         stock = int(request.form.get('stock', 0))
         
+        if stock != (product.stock or 0):
+            db.session.add(StockMovement(product_id=product.id,
+                                         quantity_change=stock - (product.stock or 0), reason='import'))
         product.stock = stock
         db.session.commit()
         
@@ -0,0 +1,288 @@
+// Offline-first sale recording for the cashier dashboard
+// Sales are written to a local IndexedDB queue first and replayed to the
+// JSON API in batches, so a slow or dropped connection never blocks the till.
+// Every queued sale carries its own idempotency key, so replaying a batch
+// that already reached the server is harmless. A batch the server refuses is
+// retried one sale at a time; sales that still fail are set aside for the
+// cashier instead of being resent forever.
+
+var OfflineSales = (function() {
+    var DB_NAME = 'smart-inventory';
+    var STORE_NAME = 'pending-sales';
+    var BATCH_SIZE = 50;  // The server accepts at most 100 sales per request
+    var RETRY_INTERVAL = 30000;
+
+    var flushing = false;
+    var options = {};
+
+    function openDatabase() {
+        return new Promise(function(resolve, reject) {
+            var request = indexedDB.open(DB_NAME, 1);
+            request.onupgradeneeded = function() {
+                request.result.createObjectStore(STORE_NAME, {keyPath: 'idempotency_key'});
+            };
+            request.onsuccess = function() { resolve(request.result); };
+            request.onerror = function() { reject(request.error); };
+        });
+    }
+
+    function withStore(mode, callback) {
+        return openDatabase().then(function(db) {
+            return new Promise(function(resolve, reject) {
+                var transaction = db.transaction(STORE_NAME, mode);
+                var result = callback(transaction.objectStore(STORE_NAME));
+                transaction.oncomplete = function() { resolve(result && result.result); };
+                transaction.onerror = function() { reject(transaction.error); };
+            });
+        });
+    }
+
+    function generateKey() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+
+    function storedSales() {
+        return withStore('readonly', function(store) { return store.getAll(); });
+    }
+
+    function pendingSales() {
+        return storedSales().then(function(sales) {
+            return sales.filter(function(sale) { return !sale.failed; });
+        });
+    }
+
+    function failedSales() {
+        return storedSales().then(function(sales) {
+            return sales.filter(function(sale) { return sale.failed; });
+        });
+    }
+
+    // Keep a sale the server keeps refusing, but stop sending it
+    function setAside(sale, message) {
+        sale.failed = true;
+        sale.failure = message;
+        return withStore('readwrite', function(store) {
+            store.put(sale);
+        }).then(function() {
+            if (options.onSetAside) {
+                options.onSetAside(sale, message);
+            }
+        });
+    }
+
+    function removeSales(keys) {
+        return withStore('readwrite', function(store) {
+            keys.forEach(function(key) { store.delete(key); });
+        });
+    }
+
+    function updateStatus() {
+        return storedSales().then(function(sales) {
+            var failed = sales.filter(function(sale) { return sale.failed; });
+            if (options.onStatus) {
+                options.onStatus(sales.length - failed.length, navigator.onLine, failed);
+            }
+        });
+    }
+
+    // Queue a sale made of one or more lines ({product_id, quantity, sale_type})
+    function queueSale(lines) {
+        var sale = {
+            idempotency_key: generateKey(),
+            sold_at: new Date().toISOString(),
+            lines: lines
+        };
+        return withStore('readwrite', function(store) {
+            store.put(sale);
+        }).then(function() {
+            updateStatus();
+            flush();
+            return sale;
+        });
+    }
+
+    function postSales(batch) {
+        return fetch(options.apiUrl, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({sales: batch})
+        }).then(function(response) {
+            if (!response.ok) {
+                var error = new Error('Server responded with ' + response.status);
+                error.status = response.status;
+                throw error;
+            }
+            return response.json();
+        });
+    }
+
+    // No connection or an expired session says nothing about the sales
+    // themselves: keep them queued and try again later
+    function isRetryable(error) {
+        return !error.status || error.status === 401 || error.status === 403;
+    }
+
+    function sendBatch(batch) {
+        return postSales(batch).then(function(data) {
+            return handleResults(batch, data);
+        }).catch(function(error) {
+            if (isRetryable(error)) {
+                throw error;
+            }
+            return sendOneByOne(batch);
+        });
+    }
+
+    // Find the sales the server refuses by sending them on their own
+    function sendOneByOne(batch) {
+        var recorded = 0;
+        return batch.reduce(function(previous, sale) {
+            return previous.then(function() {
+                return postSales([sale]).then(function(data) {
+                    return handleResults([sale], data);
+                }).then(function(count) {
+                    recorded += count;
+                }, function(error) {
+                    if (isRetryable(error)) {
+                        throw error;
+                    }
+                    return setAside(sale, error.message);
+                });
+            });
+        }, Promise.resolve()).then(function() {
+            return recorded;
+        });
+    }
+
+    // Drop the sales the server answered for and count the recorded ones
+    function handleResults(batch, data) {
+        var done = [];
+        data.results.forEach(function(result, index) {
+            var key = batch[index].idempotency_key;
+            done.push(key);
+            if (result.status === 'error' && options.onError) {
+                options.onError(result.message);
+            }
+        });
+        return removeSales(done).then(function() {
+            return data.results.filter(function(result) {
+                return result.status === 'recorded';
+            }).length;
+        });
+    }
+
+    // Replay queued sales to the server, one batch at a time
+    function flush() {
+        if (flushing || !navigator.onLine) {
+            return Promise.resolve(0);
+        }
+        flushing = true;
+        var recorded = 0;
+
+        function nextBatch() {
+            return pendingSales().then(function(sales) {
+                if (sales.length === 0) {
+                    return recorded;
+                }
+                return sendBatch(sales.slice(0, BATCH_SIZE)).then(function(count) {
+                    recorded += count;
+                    return nextBatch();
+                });
+            });
+        }
+
+        return nextBatch().catch(function() {
+            return recorded;
+        }).then(function(count) {
+            flushing = false;
+            updateStatus();
+            if (count > 0 && options.onSynced) {
+                options.onSynced(count);
+            }
+            return count;
+        });
+    }
+
+    // Collect the sale lines from a form with product_id/quantity/sale_type fields
+    function linesFromForm(form) {
+        var data = new FormData(form);
+        var quantities = data.getAll('quantity');
+        var saleTypes = data.getAll('sale_type');
+        return data.getAll('product_id').filter(function(productId) {
+            return productId;
+        }).map(function(productId, index) {
+            return {
+                product_id: parseInt(productId),
+                quantity: parseInt(quantities[index] || '1'),
+                sale_type: saleTypes[index] || 'package'
+            };
+        });
+    }
+
+    // Intercept a sale form so it is queued locally instead of posted
+    function attachForm(form, afterQueue) {
+        form.addEventListener('submit', function(event) {
+            var lines = linesFromForm(form);
+            if (lines.length === 0) {
+                return;
+            }
+            event.preventDefault();
+            queueSale(lines).then(function(sale) {
+                if (afterQueue) {
+                    afterQueue(sale);
+                }
+            });
+        });
+    }
+
+    // Put the set-aside sales back in the queue, e.g. after a server outage
+    function retryFailed() {
+        return failedSales().then(function(sales) {
+            return withStore('readwrite', function(store) {
+                sales.forEach(function(sale) {
+                    delete sale.failed;
+                    delete sale.failure;
+                    store.put(sale);
+                });
+            });
+        }).then(function() {
+            updateStatus();
+            return flush();
+        });
+    }
+
+    function init(settings) {
+        options = settings || {};
+        if (!('indexedDB' in window) || !('fetch' in window)) {
+            // Without local storage the forms keep posting to the server as before
+            return false;
+        }
+
+        if ('serviceWorker' in navigator && options.serviceWorkerUrl) {
+            navigator.serviceWorker.register(options.serviceWorkerUrl).catch(function() {});
+        }
+
+        (options.forms || []).forEach(function(form) {
+            attachForm(form, options.onQueued);
+        });
+
+        window.addEventListener('online', flush);
+        window.addEventListener('offline', updateStatus);
+        setInterval(flush, RETRY_INTERVAL);
+
+        updateStatus();
+        flush();
+        return true;
+    }
+
+    return {
+        init: init,
+        queueSale: queueSale,
+        flush: flush,
+        retryFailed: retryFailed
+    };
+})();
@@ -0,0 +1,98 @@
+// Service worker for the offline cashier mode
+// Keeps the cashier dashboard, its assets and the product catalog available
+// when the connection to the server drops. Sales made while offline are
+// queued by offline-sales.js and replayed to /api/sales later.
+
+// Bump the version whenever cached static files change
+var CACHE_NAME = 'smart-inventory-v2';
+
+var PRECACHE_URLS = [
+    '/cashier/dashboard',
+    '/api/products',
+    '/static/css/style.css',
+    '/static/css/responsive-fixes.css',
+    '/static/css/enhanced-ui.css',
+    '/static/css/mobile-responsive.css',
+    '/static/css/footer.css',
+    '/static/css/text-flow.css',
+    '/static/js/category-progress.js',
+    '/static/js/offline-sales.js',
+    '/static/manifest.webmanifest'
+];
+
+// Pages and data that change often: try the network, fall back to the cache
+var NETWORK_FIRST_PATHS = ['/cashier/dashboard', '/api/products'];
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(
+        caches.open(CACHE_NAME).then(function(cache) {
+            // Cache each URL on its own so one failure does not abort the install
+            return Promise.all(PRECACHE_URLS.map(function(url) {
+                return cache.add(url).catch(function() {});
+            }));
+        }).then(function() {
+            return self.skipWaiting();
+        })
+    );
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(
+        caches.keys().then(function(keys) {
+            return Promise.all(keys.filter(function(key) {
+                return key !== CACHE_NAME;
+            }).map(function(key) {
+                return caches.delete(key);
+            }));
+        }).then(function() {
+            return self.clients.claim();
+        })
+    );
+});
+
+function networkFirst(request) {
+    return fetch(request).then(function(response) {
+        // Only keep successful, non-redirected responses (not the login page)
+        if (response.ok && !response.redirected) {
+            var copy = response.clone();
+            caches.open(CACHE_NAME).then(function(cache) {
+                cache.put(request, copy);
+            });
+        }
+        return response;
+    }).catch(function() {
+        return caches.match(request, {ignoreSearch: true});
+    });
+}
+
+function cacheFirst(request) {
+    return caches.match(request).then(function(cached) {
+        return cached || fetch(request).then(function(response) {
+            if (response.ok) {
+                var copy = response.clone();
+                caches.open(CACHE_NAME).then(function(cache) {
+                    cache.put(request, copy);
+                });
+            }
+            return response;
+        });
+    });
+}
+
+self.addEventListener('fetch', function(event) {
+    var request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    var url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (NETWORK_FIRST_PATHS.indexOf(url.pathname) !== -1) {
+        event.respondWith(networkFirst(request));
+    } else if (url.pathname.indexOf('/static/') === 0) {
+        event.respondWith(cacheFirst(request));
+    }
+});